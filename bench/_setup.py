@@ -0,0 +1,74 @@
+"""Shared bootstrap for the benchmark scripts in this directory.
+
+Each script runs against a throwaway SQLite database so it never touches
+db.sqlite3. Usage: ``python bench/<script>.py``.
+"""
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup(db_name="bench.sqlite3", campuses=1):
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+    from django.conf import settings
+
+    tmp = tempfile.mkdtemp(prefix="cvsu-bench-")
+    settings.DATABASES["default"]["NAME"] = os.path.join(tmp, db_name)
+    if campuses > 1:
+        # campus0 shares the default database; every other campus gets its own file.
+        settings.CAMPUSES = {"campus0": {"name": "Campus 0", "database": "default"}}
+        for n in range(1, campuses):
+            settings.DATABASES[f"campus{n}"] = {**settings.DATABASES["default"], "NAME": os.path.join(tmp, f"campus{n}.sqlite3")}
+            settings.CAMPUSES[f"campus{n}"] = {"name": f"Campus {n}", "database": f"campus{n}"}
+        settings.DEFAULT_CAMPUS = "campus0"
+    settings.ALLOWED_HOSTS = ["localhost", "testserver"]
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate_campuses", verbosity=0, stdout=io.StringIO())
+    return tmp
+
+
+def make_students(count, prefix="bench"):
+    from django.contrib.auth.models import User
+
+    from portal import directory, shards
+    from portal.models import StudentProfile, StudentSearchTerm
+
+    users = User.objects.bulk_create(
+        [User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", first_name="Bench", last_name=str(i)) for i in range(count)]
+    )
+    if users and users[0].pk is None:
+        users = list(User.objects.filter(username__startswith=prefix).order_by("id"))
+    # bulk_create skips the signal that copies users into the campus databases.
+    shards.copy_shared(User, users)
+    profiles = StudentProfile.objects.bulk_create(
+        [StudentProfile(user=u, student_id=f"2024{i:06d}", course="BSCS", year_level=1 + i % 4) for i, u in enumerate(users)]
+    )
+    # bulk_create skips the save hooks, so build the directory index by hand.
+    StudentSearchTerm.objects.bulk_create(
+        [
+            StudentSearchTerm(student=p, term=term)
+            for p, u in zip(profiles, users)
+            for term in directory.terms_for(p.student_id, u.username, u.first_name, u.last_name)
+        ],
+        batch_size=5000,
+    )
+    return list(StudentProfile.objects.select_related("user").order_by("id"))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
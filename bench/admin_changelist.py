@@ -0,0 +1,146 @@
+"""Query count and latency of the admin changelists at 100k rows per table
+(20k students).
+
+Compares the tuned TransactionAdmin classes with plain ModelAdmins configured
+like the originals (no select_related, full COUNT(*), default paginator).
+"""
+import importlib
+import time
+
+from _setup import make_students, setup
+
+setup()
+
+from datetime import timedelta  # noqa: E402
+
+from django.conf import settings  # noqa: E402
+from django.contrib import admin  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import clear_url_caches  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from portal.models import Appointment, DocumentRequest, DocumentType, FeePayment, Inquiry  # noqa: E402
+
+ROWS = 100_000
+
+students = make_students(20_000)
+types = [DocumentType.objects.create(name=f"Document {i}", fee=50 + i) for i in range(40)]
+now = timezone.now()
+statuses = ["PENDING", "APPROVED", "REJECTED", "RELEASED"]
+
+DocumentRequest.objects.bulk_create(
+    [
+        DocumentRequest(
+            reference_no=f"DR{i:012d}",
+            student=students[i % 20_000],
+            doc_type=types[i % 40],
+            purpose="Scholarship",
+            status=statuses[i % 4],
+        )
+        for i in range(ROWS)
+    ],
+    batch_size=5000,
+)
+FeePayment.objects.bulk_create(
+    [
+        FeePayment(student=students[i % 20_000], fee_name="Tuition", amount=1000, paid_at=now - timedelta(minutes=i))
+        for i in range(ROWS)
+    ],
+    batch_size=5000,
+)
+Appointment.objects.bulk_create(
+    [
+        Appointment(student=students[i % 20_000], office=f"Office {i % 12}", topic="Enrollment", schedule=now + timedelta(minutes=i))
+        for i in range(ROWS)
+    ],
+    batch_size=5000,
+)
+Inquiry.objects.bulk_create(
+    [Inquiry(student=students[i % 20_000], subject=f"Question {i}", message="Hello") for i in range(ROWS)],
+    batch_size=5000,
+)
+connection.cursor().execute("ANALYZE")
+
+User.objects.create_superuser("admin", "admin@example.com", "pw")
+client = Client(HTTP_HOST="localhost")
+client.force_login(User.objects.get(username="admin"))
+
+URLS = [
+    "/admin/portal/documentrequest/",
+    "/admin/portal/documentrequest/?status__exact=PENDING",
+    "/admin/portal/documentrequest/?p=40",
+    "/admin/portal/feepayment/",
+    "/admin/portal/appointment/",
+    "/admin/portal/inquiry/",
+    "/admin/portal/documentrequest/?q=2024000012",
+    "/admin/portal/feepayment/?q=bench4242",
+    "/admin/portal/feepayment/?q=Tuition",
+    "/admin/portal/documentrequest/1/change/",
+]
+
+
+class PlainRequestAdmin(admin.ModelAdmin):
+    list_display = ("reference_no", "student", "doc_type", "status", "requested_at")
+    list_filter = ("status", "doc_type")
+    search_fields = ("reference_no", "student__student_id", "student__user__username")
+
+
+class PlainAppointmentAdmin(admin.ModelAdmin):
+    list_display = ("student", "office", "schedule", "status")
+    list_filter = ("office", "status")
+
+
+class PlainPaymentAdmin(admin.ModelAdmin):
+    list_display = ("student", "fee_name", "amount", "status", "paid_at")
+    list_filter = ("status",)
+
+
+class PlainInquiryAdmin(admin.ModelAdmin):
+    list_display = ("student", "subject", "status", "created_at")
+    list_filter = ("status",)
+
+
+def measure(label, repeat=3, urls=URLS):
+    print(label)
+    for url in urls:
+        client.get(url)
+        db = [0.0]
+        wall_ms = 0.0
+
+        def timed(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db[0] += time.perf_counter() - started
+
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx, connection.execute_wrapper(timed):
+                started = time.perf_counter()
+                response = client.get(url)
+                wall_ms += (time.perf_counter() - started) * 1000
+            assert response.status_code == 200, (url, response.status_code)
+        db_ms = db[0] * 1000 / repeat
+        print(
+            f"  {url:55} {len(ctx.captured_queries):3} queries "
+            f"db={db_ms:7.2f}ms total={wall_ms / repeat:7.1f}ms"
+        )
+
+
+measure("tuned admin")
+
+for model, plain in [
+    (DocumentRequest, PlainRequestAdmin),
+    (Appointment, PlainAppointmentAdmin),
+    (FeePayment, PlainPaymentAdmin),
+    (Inquiry, PlainInquiryAdmin),
+]:
+    admin.site.unregister(model)
+    admin.site.register(model, plain)
+# The admin's URL patterns are bound to the admin instances at import time.
+importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+clear_url_caches()
+measure("plain admin")
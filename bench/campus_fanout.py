@@ -0,0 +1,95 @@
+"""Staff pages over four campus databases (50k requests each, 10% still open).
+
+Times the staff dashboard, due queue and a request search with the campus
+queries run in parallel (CAMPUS_FANOUT_WORKERS) and one campus after another.
+With a round-trip time (ms) every query also waits that long, standing in
+for campus databases on their own servers; on local SQLite files the campuses
+only run in parallel as far as there are CPUs to run them.
+Usage: ``python bench/campus_fanout.py [requests per campus] [round trip ms]``.
+"""
+import sys
+import time
+
+from _setup import make_students, setup
+
+CAMPUSES = 4
+setup(campuses=CAMPUSES)
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from portal import shards, sla  # noqa: E402
+from portal.models import DocumentRequest, DocumentType  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+ROUND_TRIP = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+STUDENTS = 2_000
+
+types = [DocumentType.objects.create(name=f"Document {i}", fee=50, processing_days=1 + i % 10) for i in range(20)]
+now = timezone.now()
+closed = ["REJECTED", "RELEASED"]
+
+for campus in shards.campuses():
+    with shards.use(campus):
+        students = make_students(STUDENTS, prefix=f"{campus}-")
+        DocumentRequest.objects.bulk_create(
+            [
+                DocumentRequest(
+                    reference_no=f"DR{campus}{i:010d}",
+                    student=students[i % STUDENTS],
+                    doc_type=types[i % 20],
+                    purpose="Scholarship",
+                    status=sla.OPEN_STATUSES[i % 2] if i >= ROWS * 0.9 else closed[i % 2],
+                    due_at=now,
+                )
+                for i in range(ROWS)
+            ],
+            batch_size=5000,
+        )
+        connections[shards.alias()].cursor().execute("ANALYZE")
+print(f"{CAMPUSES} campuses x {ROWS} requests, {ROUND_TRIP * 1000:g} ms per query round trip")
+
+
+def round_trip(execute, sql, params, many, context):
+    time.sleep(ROUND_TRIP)
+    return execute(sql, params, many, context)
+
+
+def add_round_trip(sender, connection, **kwargs):
+    connection.execute_wrappers.append(round_trip)
+
+
+if ROUND_TRIP:
+    connections.close_all()
+    connection_created.connect(add_round_trip)
+
+User.objects.create_user("staff", "staff@example.com", "pw", is_staff=True)
+client = Client(HTTP_HOST="localhost")
+client.force_login(User.objects.get(username="staff"))
+URLS = ("/dashboard/", "/requests/due/", "/requests/due/?days=5", "/requests/?q=campus3-7")
+
+
+def best_of(url, repeat=5):
+    client.get(url)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        times.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return min(times)
+
+
+results = {}
+for workers in (CAMPUSES, 1):
+    settings.CAMPUS_FANOUT_WORKERS = workers
+    shards._executor = None
+    results[workers] = [best_of(url) for url in URLS]
+
+print(f"{'':28} {'parallel':>10} {'serial':>10}")
+for url, parallel, serial in zip(URLS, results[CAMPUSES], results[1]):
+    print(f"GET {url:24} {parallel:8.1f} ms {serial:7.1f} ms")
@@ -0,0 +1,92 @@
+"""Finance report build time at a million payments.
+
+Compares reports.build() (columns pulled once into typed arrays, then every
+pivot is a pass over the arrays) with an ORM loop over FeePayment instances
+and with one GROUP BY query per report. Usage:
+``python bench/fee_reports.py [payments]``.
+"""
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from _setup import make_students, setup
+
+setup()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+from django.db.models.functions import TruncDate  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from portal import reports  # noqa: E402
+from portal.models import FeePayment, StudentProfile  # noqa: E402
+
+PAYMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+FEES = ["Tuition", "Miscellaneous", "Laboratory", "Library", "ID Replacement", "Graduation", "Transcript", "Athletics"]
+COURSES = ["BSCS", "BSIT", "BSEd", "BSBA", "BSHM", "BSPsych"]
+
+rng = random.Random(11)
+students = make_students(5000)
+for s in students:
+    s.course = rng.choice(COURSES)
+StudentProfile.objects.bulk_update(students, ["course"], batch_size=1000)
+
+started = time.perf_counter()
+now = timezone.now()
+for offset in range(0, PAYMENTS, 20_000):
+    with transaction.atomic():
+        FeePayment.objects.bulk_create(
+            [
+                FeePayment(
+                    student=rng.choice(students),
+                    fee_name=rng.choice(FEES),
+                    amount=Decimal(rng.randrange(5000, 2500000)) / 100,
+                    status="VERIFIED" if rng.random() < 0.8 else "PENDING",
+                    paid_at=now - timedelta(minutes=rng.randrange(0, 60 * 24 * 365)),
+                )
+                for _ in range(min(20_000, PAYMENTS - offset))
+            ]
+        )
+print(f"seeded {PAYMENTS} payments in {time.perf_counter() - started:.1f}s")
+
+
+def orm_loop():
+    fees, courses, days = defaultdict(Decimal), defaultdict(Decimal), defaultdict(Decimal)
+    for p in FeePayment.objects.filter(status="VERIFIED").select_related("student"):
+        fees[p.fee_name] += p.amount
+        courses[(p.student.course, p.student.year_level)] += p.amount
+        days[timezone.localtime(p.paid_at).date()] += p.amount
+    return fees, courses, days
+
+
+def group_by():
+    qs = FeePayment.objects.filter(status="VERIFIED").order_by()
+    return (
+        list(qs.values("fee_name").annotate(n=Count("id"), total=Sum("amount"))),
+        list(qs.values("student__course", "student__year_level").annotate(n=Count("id"), total=Sum("amount"))),
+        list(qs.annotate(day=TruncDate("paid_at")).values("day").annotate(n=Count("id"), total=Sum("amount"))),
+    )
+
+
+def timed(label, fn):
+    t = time.perf_counter()
+    result = fn()
+    print(f"{label:12} {time.perf_counter() - t:7.2f}s")
+    return result
+
+
+report = timed("arrays", reports.build)
+t = time.perf_counter()
+cols = reports.PaymentColumns.load()
+load = time.perf_counter() - t
+t = time.perf_counter()
+reports.fee_totals(cols), reports.course_pivot(cols), reports.daily_totals(cols)
+print(f"  load {load:.2f}s, pivots {time.perf_counter() - t:.2f}s, {len(cols)} rows")
+fees, _, _ = timed("orm loop", orm_loop)
+timed("group by", group_by)
+
+assert {r["fee_name"]: r["total"] for r in report["fees"]} == dict(fees), "array totals differ from the ORM loop"
+print("totals match")
@@ -0,0 +1,87 @@
+"""Submissions/sec through the views: per-row autocommit vs group commit.
+
+Each worker thread plays a logged-in student posting document requests, fee
+payments and inquiries back to back through an in-process client, against an
+on-disk SQLite database. Rate limits are off, but the admission queue in front
+of the submission views stays on: it admits at most ADMISSION_MAX_ACTIVE
+writers per process, and a group-commit batch only holds rows from admitted
+writers. The last run sizes the queue to the worker count to show what that
+cap costs. A 429 is retried after a short pause and counted.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _setup import make_students, setup
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from portal import groupcommit, ratelimit  # noqa: E402
+from portal.models import DocumentRequest, DocumentType  # noqa: E402
+
+THREADS = 32
+PER_THREAD = 60
+
+logging.getLogger("django.request").setLevel(logging.CRITICAL)
+settings.DEBUG = False
+students = make_students(THREADS)
+doc_type = DocumentType.objects.create(name="Certificate of Grades", fee=50)
+sessions = []
+for student in students:
+    client = Client()
+    client.force_login(student.user)
+    sessions.append(client.cookies)
+
+
+def submission(i):
+    kind = i % 3
+    if kind == 0:
+        return "/requests/new/", {"doc_type": doc_type.pk, "purpose": f"bench {i}"}
+    if kind == 1:
+        return "/payments/new/", {"fee_name": "Lab Fee", "amount": "100.00", "reference": f"OR-{i}", "paid_at": "2026-01-15 09:00"}
+    return "/inquiries/new/", {"subject": f"Question {i}", "message": "When can I claim my document?"}
+
+
+def run(label, group_commit, max_active):
+    groupcommit.committer = groupcommit.GroupCommitter(settings.GROUP_COMMIT_WINDOW, settings.GROUP_COMMIT_MAX_BATCH)
+    ratelimit.admission = ratelimit.AdmissionQueue(max_active, THREADS, 60)
+    shed = []
+
+    def worker(n):
+        client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        client.cookies = sessions[n]
+        for i in range(PER_THREAD):
+            url, data = submission(i)
+            while True:
+                status = client.post(url, data).status_code
+                if status != 429:
+                    assert status == 302, status
+                    break
+                shed.append(status)
+                time.sleep(0.01)
+        connection.close()
+
+    with override_settings(GROUP_COMMIT=group_commit, RATE_LIMITS={}):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(worker, range(THREADS)))
+        elapsed = time.perf_counter() - started
+    total = THREADS * PER_THREAD
+    committer = groupcommit.committer
+    batches = f", {committer.rows / max(committer.batches, 1):4.1f} rows per transaction" if group_commit else ""
+    print(f"{label:34} {total / elapsed:7.1f} submissions/s (429s retried: {len(shed)}{batches})")
+
+
+active = settings.ADMISSION_MAX_ACTIVE
+print(f"{THREADS} students x {PER_THREAD} submissions")
+run(f"per-row, {active} admitted", False, active)
+run(f"group commit, {active} admitted", True, active)
+run(f"group commit, {THREADS} admitted", True, THREADS)
+
+refs = list(DocumentRequest.objects.values_list("reference_no", flat=True))
+assert len(refs) == len(set(refs)), "duplicate reference numbers"
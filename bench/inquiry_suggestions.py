@@ -0,0 +1,105 @@
+"""Reply suggestions and duplicate lookup over 100k inquiries (80% answered).
+
+Times the indexed lookups used by the inquiry Process page against scoring
+every answered inquiry in Python, and reports how long a full index rebuild
+and a single incremental reindex take.
+"""
+import math
+import random
+import time
+
+from _setup import make_students, percentile, setup
+
+setup()
+
+from django.db import connection  # noqa: E402
+
+from portal import suggestions  # noqa: E402
+from portal.models import Inquiry, InquiryTerm  # noqa: E402
+
+ROWS = 100_000
+random.seed(7)
+
+TOPICS = [
+    ("transcript of records", "TOR"), ("certificate of grades", "COG"), ("good moral certificate", "good moral"),
+    ("diploma", "diploma"), ("enrollment", "enrollment"), ("scholarship", "scholarship"), ("ID replacement", "ID"),
+    ("tuition refund", "refund"), ("shifting of course", "shifting"), ("cross enrollment", "cross-enroll"),
+    ("completion of incomplete grade", "INC"), ("honorable dismissal", "transfer credentials"),
+]
+ASKS = [
+    "When can I claim my {0}?", "How long does processing of the {0} take?", "Requirements for {1} request",
+    "Follow up on my {0} request", "Can someone else claim my {1} for me?", "Is there a fee for the {0}?",
+    "My {1} request is still pending", "Where do I submit documents for {0}?",
+]
+FILLER = ["Thank you po.", "I need it for my job application.", "I am a graduating student.", "Please help.", "Good day!", ""]
+
+students = make_students(2_000)
+batch = []
+for i in range(ROWS):
+    topic = random.choice(TOPICS)
+    ask = random.choice(ASKS)
+    answered = i < ROWS * 0.8
+    batch.append(
+        Inquiry(
+            student=students[i % 2_000],
+            subject=ask.format(*topic)[:160],
+            message=f"{ask.format(*topic)} {random.choice(FILLER)} Ref {i}",
+            status="ANSWERED" if answered else "OPEN",
+            reply=f"Your {topic[1]} request is handled by the Registrar within 3-5 days." if answered else "",
+        )
+    )
+Inquiry.objects.bulk_create(batch, batch_size=5000)
+
+started = time.perf_counter()
+suggestions.rebuild()
+print(f"rebuild: {ROWS} inquiries, {InquiryTerm.objects.count()} terms in {time.perf_counter() - started:.1f} s")
+connection.cursor().execute("ANALYZE")
+
+open_ids = list(Inquiry.objects.filter(status="OPEN").values_list("pk", flat=True)[:200])
+samples = list(Inquiry.objects.in_bulk(open_ids).values())
+
+
+def timed(fn):
+    times = []
+    for obj in samples:
+        started = time.perf_counter()
+        fn(obj)
+        times.append((time.perf_counter() - started) * 1000)
+    return percentile(times, 50), percentile(times, 95)
+
+
+answered = [
+    (pk, suggestions.term_counts(subject, message))
+    for pk, subject, message in Inquiry.objects.filter(status__in=suggestions.ANSWERED).values_list("pk", "subject", "message")
+]
+
+
+def brute_force(obj):
+    # Scores every answered inquiry by cosine over raw term counts.
+    query = suggestions.term_counts(obj.subject, obj.message)
+    qnorm = math.sqrt(sum(v * v for v in query.values()))
+    scored = []
+    for pk, counts in answered:
+        dot = sum(query[t] * counts[t] for t in query if t in counts)
+        if dot:
+            scored.append((dot / (qnorm * math.sqrt(sum(v * v for v in counts.values()))), pk))
+    scored.sort(reverse=True)
+    return scored[:5]
+
+
+for label, fn in (
+    ("suggested_replies", suggestions.suggested_replies),
+    ("open_duplicates", suggestions.open_duplicates),
+    ("reindex one inquiry", suggestions.reindex),
+):
+    p50, p95 = timed(fn)
+    print(f"{label:20} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+samples = samples[:10]
+p50, p95 = timed(brute_force)
+print(f"{'python brute force':20} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+example = Inquiry.objects.get(pk=open_ids[0])
+print("example:", example.subject)
+for other, score in suggestions.suggested_replies(example, 3):
+    print(f"  {score:.2f}  {other.subject}")
+print(f"  {len(suggestions.open_duplicates(example))} open near-duplicates")
@@ -0,0 +1,102 @@
+"""The staff due queue at 200k requests (10% still open).
+
+Compares reading the (status, due_at) index in order with the obvious
+alternative: load every open request, work out its due date on the business
+calendar in Python, then filter and sort.
+"""
+import time
+
+from _setup import make_students, setup
+
+setup()
+
+from datetime import timedelta  # noqa: E402
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from portal import sla  # noqa: E402
+from portal.models import DocumentRequest, DocumentType  # noqa: E402
+from portal.views import DUE_QUEUE_LIMIT  # noqa: E402
+
+ROWS = 200_000
+
+students = make_students(5_000)
+types = [DocumentType.objects.create(name=f"Document {i}", fee=50, processing_days=1 + i % 10) for i in range(20)]
+now = timezone.now()
+closed = ["REJECTED", "RELEASED"]
+
+DocumentRequest.objects.bulk_create(
+    [
+        DocumentRequest(
+            reference_no=f"DR{i:012d}",
+            student=students[i % 5_000],
+            doc_type=types[i % 20],
+            purpose="Scholarship",
+            # The newest tenth is still open.
+            status=sla.OPEN_STATUSES[i % 2] if i >= ROWS * 0.9 else closed[i % 2],
+            due_at=now,
+        )
+        for i in range(ROWS)
+    ],
+    batch_size=5000,
+)
+# auto_now_add stamped every row with now; spread them over the past year, three minutes apart.
+with connection.cursor() as cursor:
+    cursor.execute(
+        "UPDATE portal_documentrequest SET requested_at = datetime(%s, '-' || ((%s - id) * 3) || ' minutes')",
+        [now.strftime("%Y-%m-%d %H:%M:%S"), ROWS],
+    )
+started = time.perf_counter()
+sla.reschedule(DocumentRequest.objects.all())
+print(f"reschedule_requests --all: {ROWS} rows in {time.perf_counter() - started:.1f} s")
+connection.cursor().execute("ANALYZE")
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times), result
+
+
+horizon = sla.end_of_day(timezone.localdate())
+
+
+def indexed():
+    return sla.due_queue(DocumentRequest.objects.select_related("student", "doc_type"), horizon, DUE_QUEUE_LIMIT)
+
+
+def python_calendar():
+    rows = DocumentRequest.objects.filter(status__in=sla.OPEN_STATUSES).select_related("student", "doc_type")
+    due = []
+    for row in rows:
+        when = sla.due_at(row.requested_at, row.doc_type.processing_days)
+        if when < horizon:
+            due.append((when, row))
+    due.sort(key=lambda pair: pair[0])
+    return [row for _, row in due[:DUE_QUEUE_LIMIT]]
+
+
+qs = DocumentRequest.objects.filter(status="PENDING", due_at__lt=horizon).order_by("due_at")[:DUE_QUEUE_LIMIT]
+print("plan per status:", qs.explain().replace("\n", " | "))
+
+ms_index, fast = best_of(indexed)
+ms_python, slow = best_of(python_calendar, repeat=3)
+assert [r.due_at for r in fast] == [r.due_at for r in slow]
+print(f"open rows: {DocumentRequest.objects.filter(status__in=sla.OPEN_STATUSES).count()}, shown: {len(fast)}")
+print(f"index range scan   {ms_index:8.1f} ms")
+print(f"python calendar    {ms_python:8.1f} ms")
+
+User.objects.create_user("staff", "staff@example.com", "pw", is_staff=True)
+client = Client(HTTP_HOST="localhost")
+client.force_login(User.objects.get(username="staff"))
+for url in ("/requests/due/", "/requests/due/?days=5"):
+    client.get(url)
+    ms, response = best_of(lambda: client.get(url))
+    assert response.status_code == 200
+    print(f"GET {url:24} {ms:8.1f} ms")
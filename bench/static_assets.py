@@ -0,0 +1,72 @@
+"""Bytes a browser downloads for a first and a repeat visit to the home page.
+
+"plain": assets collected under their own names, uncompressed, revalidated on
+every visit (what serving STATICFILES_DIRS as-is gives you). "pipeline": the
+CompressedManifestStorage build served by StaticFilesMiddleware. The browser
+keeps what it is allowed to cache and sends If-None-Match for the rest.
+"""
+import os
+import re
+
+from _setup import setup
+
+tmp = setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+ACCEPT = "gzip, deflate, br"
+PAGE = "/"
+
+
+def header_bytes(response):
+    # Status line plus one "Name: value\r\n" per header and the blank line.
+    return 17 + sum(len(k) + len(v) + 4 for k, v in response.items()) + 2
+
+
+class Browser:
+    def __init__(self):
+        self.client = Client(HTTP_HOST="localhost")
+        self.cache = {}  # url -> (etag, reusable without asking)
+
+    def fetch(self, url):
+        cached = self.cache.get(url)
+        if cached and cached[1]:
+            return 0, 0
+        extra = {"HTTP_IF_NONE_MATCH": cached[0]} if cached else {}
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING=ACCEPT, **extra)
+        assert response.status_code in (200, 304), (url, response.status_code)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        if "ETag" in response:
+            fresh = "immutable" in response.get("Cache-Control", "")
+            self.cache[url] = (response["ETag"], fresh)
+        return 1, header_bytes(response) + len(body)
+
+    def visit(self):
+        requests, total = self.fetch(PAGE)
+        html = self.client.get(PAGE).content.decode()
+        for url in re.findall(r'(?:href|src)="(/static/[^"]+)"', html):
+            r, b = self.fetch(url)
+            requests += r
+            total += b
+        return requests, total
+
+
+def run(label, storage, max_age):
+    root = os.path.join(tmp, label)
+    with override_settings(
+        STATIC_ROOT=root,
+        STATIC_MAX_AGE=max_age,
+        DEBUG=False,
+        STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": storage}},
+    ):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        browser = Browser()
+        first = browser.visit()
+        repeat = browser.visit()
+    print(f"{label:9} first: {first[0]} requests {first[1]:8,} bytes   repeat: {repeat[0]} requests {repeat[1]:6,} bytes")
+
+
+run("plain", "django.contrib.staticfiles.storage.StaticFilesStorage", 0)
+run("pipeline", "portal.assets.CompressedManifestStorage", 60)
@@ -0,0 +1,75 @@
+"""Typeahead latency of the student directory index at 100k students.
+
+Compares directory.lookup() (prefix range scans on StudentSearchTerm) with the
+old icontains OR across student_id and auth_user name columns.
+"""
+import random
+import time
+
+from _setup import percentile, setup
+
+setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from portal import directory  # noqa: E402
+from portal.models import StudentProfile, StudentSearchTerm  # noqa: E402
+
+STUDENTS = 100_000
+FIRST = ["Juan", "Maria", "José", "Ana", "Mark", "Angelica", "John", "Kristine", "Paolo", "Camille", "Rafael", "Bea"]
+LAST = ["Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Bautista", "Villanueva", "Ramos", "Aquino", "Castillo"]
+
+rng = random.Random(7)
+started = time.perf_counter()
+for offset in range(0, STUDENTS, 10_000):
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f"stu{i}",
+                first_name=rng.choice(FIRST),
+                last_name=f"{rng.choice(LAST)}{i % 997}",
+            )
+            for i in range(offset, offset + 10_000)
+        ]
+    )
+    profiles = StudentProfile.objects.bulk_create(
+        [StudentProfile(user=u, student_id=f"2{i:08d}", course="BSIT") for i, u in zip(range(offset, offset + 10_000), users)]
+    )
+    StudentSearchTerm.objects.bulk_create(
+        [
+            StudentSearchTerm(student=p, term=term)
+            for p, u in zip(profiles, users)
+            for term in directory.terms_for(p.student_id, u.username, u.first_name, u.last_name)
+        ]
+    )
+print(f"seeded {STUDENTS} students in {time.perf_counter() - started:.1f}s")
+
+queries = ["2000", "200451", "juan", "maria san", "dela cruz4", "stu9999", "camille rey", "x"]
+
+
+def legacy(q):
+    return list(
+        StudentProfile.objects.select_related("user")
+        .filter(
+            Q(student_id__icontains=q)
+            | Q(user__username__icontains=q)
+            | Q(user__first_name__icontains=q)
+            | Q(user__last_name__icontains=q)
+        )[:10]
+    )
+
+
+for label, fn in [("directory", directory.lookup), ("icontains", legacy)]:
+    timings = []
+    for _ in range(5):
+        for q in queries:
+            t = time.perf_counter()
+            fn(q)
+            timings.append((time.perf_counter() - t) * 1000)
+    print(f"{label:10} p50={percentile(timings, 50):6.2f}ms p99={percentile(timings, 99):6.2f}ms max={max(timings):6.2f}ms")
+
+for q in queries:
+    t = time.perf_counter()
+    directory.lookup(q)
+    print(f"  {q!r:14} {(time.perf_counter() - t) * 1000:6.2f}ms")
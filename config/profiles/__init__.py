@@ -0,0 +1,4 @@
+"""Role-specific settings. Each module starts from config.settings and drops
+what that role never uses, e.g. ``DJANGO_SETTINGS_MODULE=config.profiles.worker``
+for ``manage.py run_jobs``. Compare them with ``manage.py profile_startup``.
+"""
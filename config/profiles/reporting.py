@@ -0,0 +1,5 @@
+"""A separate instance for staff finance reports and CSV exports: the portal
+pages without the admin site."""
+from config.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "django.contrib.admin"]
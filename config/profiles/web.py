@@ -0,0 +1,2 @@
+"""The full site: portal pages, staff admin, sessions and messages."""
+from config.settings import *  # noqa: F401,F403
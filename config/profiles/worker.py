@@ -0,0 +1,11 @@
+"""Background job workers and maintenance commands (run_jobs, send_digests,
+archive_transactions, rebuild_summaries). No HTTP is served, so there is no
+admin, session, message or static file handling and no middleware."""
+from config.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "portal",
+]
+MIDDLEWARE = []
@@ -41,11 +41,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'portal.assets.StaticFilesMiddleware',
+    'portal.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'portal.shards.CampusMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,7 +57,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'portal.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'portal.shards.context',
             ],
         },
     },
@@ -81,6 +85,18 @@ DATABASES = {
     }
 }
 
+# Each campus keeps its students' records in its own database (an alias in
+# DATABASES); users, document types and the job queue stay in "default". To
+# add a campus, add its database and an entry here, then run
+# manage.py migrate_campuses. Staff lists show every campus at once.
+CAMPUSES = {
+    "bacoor": {"name": "Bacoor City Campus", "database": "default"},
+}
+DEFAULT_CAMPUS = "bacoor"
+DATABASE_ROUTERS = ["portal.shards.CampusRouter"]
+# Threads used to query the campus databases in parallel.
+CAMPUS_FANOUT_WORKERS = 8
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -118,6 +134,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# collectstatic writes content-hashed, precompressed copies here, and
+# portal.assets.StaticFilesMiddleware serves them with far-future caching.
+STATIC_ROOT = BASE_DIR / "var" / "static"
+# Cache lifetime for files without a content hash in their name.
+STATIC_MAX_AGE = 60
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "portal.assets.CompressedManifestStorage"},
+}
 
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "dashboard"
@@ -127,3 +152,77 @@ LOGOUT_REDIRECT_URL = "login"
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Email
+# Status notifications are sent by the background worker (manage.py run_jobs).
+
+EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+DEFAULT_FROM_EMAIL = "CVSU Bacoor Portal <no-reply@cvsu-bacoor.edu.ph>"
+
+# Status events for a student are coalesced into one digest email per window.
+NOTIFICATION_DIGEST_WINDOW = 300
+NOTIFICATION_BATCH_SIZE = 100
+
+# Seconds a staff member keeps items claimed from their work queue.
+WORK_CLAIM_LEASE = 900
+
+# Closed transactions older than this are moved out of the hot tables by
+# manage.py archive_transactions.
+ARCHIVE_RETENTION_DAYS = 365
+
+# Submission throttling: (requests, seconds) sliding-window limits per user/IP and
+# for the whole site, plus a per-process cap on concurrent writers. Requests
+# beyond these get a 429 "try again" page instead of queueing on the DB lock.
+RATE_LIMITS = {
+    "submit": {
+        "user": (10, 60),
+        "global": (50, 1),
+    },
+}
+# Reverse proxies in front of the app that append to X-Forwarded-For; the
+# per-IP limit keys on the address the outermost of them saw. 0: REMOTE_ADDR.
+RATE_LIMIT_PROXY_COUNT = 0
+ADMISSION_MAX_ACTIVE = 4
+ADMISSION_MAX_WAITING = 16
+ADMISSION_WAIT_SECONDS = 2.0
+
+# Opt-in group commit for request/payment/inquiry submissions: inserts that
+# arrive within GROUP_COMMIT_WINDOW seconds share one transaction. Request and
+# payment submissions pass the admission queue first, so a batch holds at most
+# about ADMISSION_MAX_ACTIVE of them; raise that cap along with GROUP_COMMIT.
+# Measure with python bench/group_commit.py before turning it on.
+GROUP_COMMIT = False
+GROUP_COMMIT_WINDOW = 0.005
+GROUP_COMMIT_MAX_BATCH = 200
+
+# Claim slips and payment receipts are rendered once per record version and
+# cached here. Set PRINTABLES_ACCEL_REDIRECT to an nginx internal location
+# aliased to this directory to have the web server send the files instead.
+PRINTABLES_DIR = BASE_DIR / "var" / "printables"
+PRINTABLES_ACCEL_REDIRECT = ""
+
+# Proof-of-payment uploads are streamed to this directory, stored once per
+# distinct content hash, and cut off as soon as they pass the size limit.
+PAYMENT_PROOF_DIR = BASE_DIR / "var" / "proofs"
+PAYMENT_PROOF_MAX_BYTES = 5 * 1024 * 1024
+PAYMENT_PROOF_MAX_FILES = 5
+
+# Per-view latency/DB/template metrics. Each worker process writes its totals
+# here (at most every METRICS_FLUSH_INTERVAL seconds) and /metrics/ sums them.
+# Staff can open /metrics/; a scraper sends "Authorization: Bearer <token>".
+METRICS_DIR = BASE_DIR / "var" / "metrics"
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = ""
+
+# Request due dates: processing_days business days after filing, at closing
+# time. Weekend days are weekday() numbers; holidays are "YYYY-MM-DD" strings.
+# Run manage.py reschedule_requests after changing these.
+SLA_CLOSING_TIME = "17:00"
+SLA_WEEKEND = (5, 6)
+SLA_HOLIDAYS = []
+
+# Create forms carry an idempotency key; a resubmitted form gets the original
+# redirect back for IDEMPOTENCY_TTL seconds instead of creating a duplicate.
+# A retry that races the original waits up to IDEMPOTENCY_WAIT_SECONDS for it.
+IDEMPOTENCY_TTL = 3600
+IDEMPOTENCY_WAIT_SECONDS = 5.0
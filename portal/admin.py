@@ -1,10 +1,140 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+from . import directory, shards
 from .models import StudentProfile, DocumentType, DocumentRequest, Appointment, FeePayment, Inquiry
 
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs a full COUNT(*) over a huge table.
+
+    Counts are taken over at most ``cap`` rows (a LIMITed subquery). Past that,
+    unfiltered lists use the planner's row estimate on PostgreSQL or the id
+    range elsewhere, and filtered lists just report the cap.
+    """
+
+    cap = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        bounded = qs.order_by()[: self.cap].count()
+        if bounded < self.cap or qs.query.where:
+            return bounded
+        return max(bounded, _estimated_rows(qs.model))
+
+def _estimated_rows(model):
+    connection = connections[model.objects.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [model._meta.db_table])
+            row = cursor.fetchone()
+        return max(row[0], 0) if row else 0
+    # Both ends of the primary key index. Archiving removes the oldest rows,
+    # so the range shrinks with it; only deletes in the middle overcount.
+    ids = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+    return ids["high"] - ids["low"] + 1 if ids["high"] is not None else 0
+
+class ActiveDocumentTypeFilter(admin.SimpleListFilter):
+    title = "document type"
+    parameter_name = "doc_type"
+
+    def lookups(self, request, model_admin):
+        return DocumentType.objects.filter(is_active=True).order_by("name").values_list("pk", "name")
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(doc_type_id=int(self.value()))
+        return queryset
+
+class CampusAdmin(admin.ModelAdmin):
+    """Changelist for a per-campus model: it lists the staff member's working
+    campus only, so with several campuses the title names it."""
+
+    def get_changelist_instance(self, request):
+        cl = super().get_changelist_instance(request)
+        if len(shards.campuses()) > 1:
+            cl.title = f"{cl.title} ({shards.name(shards.current())})"
+        return cl
+
+class TransactionAdmin(CampusAdmin):
+    """Changelist settings shared by the high-volume transaction tables.
+
+    Search is a prefix match on ``search_fields`` OR'd with the student
+    directory. Selective terms are resolved through index range scans (as
+    typed, upper-case and capitalized) and only the matching rows are sorted;
+    terms matching a large share of the table fall back to walking the list in
+    display order, which fills a page almost immediately.
+    """
+
+    list_per_page = 50
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    autocomplete_fields = ("student",)
+    selective_search_rows = 2000
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        if self.search_help_text is None:
+            fields = " or ".join(str(model._meta.get_field(name).verbose_name) for name in self.search_fields)
+            self.search_help_text = f"Prefix search: matches the start of the {fields}, or of a student's ID or name."
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        ranges = Q()
+        prefixes = Q()
+        for field in self.search_fields:
+            prefixes |= Q(**{f"{field}__istartswith": term})
+            for variant in {term, term.upper(), term.capitalize()}:
+                ranges |= Q(**{f"{field}__gte": variant, f"{field}__lt": variant + directory.PREFIX_END})
+        students = directory.match_ids(term)
+        if students is not None:
+            ranges |= Q(student__in=students)
+            prefixes |= Q(student__in=students)
+
+        matches = self.model.objects.filter(ranges).order_by()
+        if matches[: self.selective_search_rows].count() < self.selective_search_rows:
+            return queryset.filter(pk__in=matches.values("pk")), False
+        return queryset.filter(prefixes), False
+
 @admin.register(StudentProfile)
-class StudentProfileAdmin(admin.ModelAdmin):
-    list_display = ("student_id", "user", "course", "year_level", "created_at")
+class StudentProfileAdmin(CampusAdmin):
+    list_display = ("student_id", "user", "course", "year_level", "open_requests", "unanswered_inquiries", "last_activity", "created_at")
+    list_select_related = ("user", "summary")
     search_fields = ("student_id", "user__username", "user__first_name", "user__last_name")
+    search_help_text = "Prefix search: matches the start of a student ID, username, first or last name."
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix lookup on the student directory index instead of OR-ing icontains across auth_user.
+        ids = directory.match_ids(search_term)
+        if ids is None:
+            return queryset, False
+        return queryset.filter(pk__in=ids), False
+
+    def _summary(self, obj):
+        try:
+            return obj.summary
+        except StudentProfile.summary.RelatedObjectDoesNotExist:
+            return None
+
+    @admin.display(description="Open requests")
+    def open_requests(self, obj):
+        summary = self._summary(obj)
+        return summary.open_requests if summary else "-"
+
+    @admin.display(description="Unanswered inquiries")
+    def unanswered_inquiries(self, obj):
+        summary = self._summary(obj)
+        return summary.unanswered_inquiries if summary else "-"
+
+    @admin.display(description="Last activity")
+    def last_activity(self, obj):
+        summary = self._summary(obj)
+        return summary.last_activity if summary and summary.last_activity else "-"
 
 @admin.register(DocumentType)
 class DocumentTypeAdmin(admin.ModelAdmin):
@@ -13,25 +143,36 @@ class DocumentTypeAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 @admin.register(DocumentRequest)
-class DocumentRequestAdmin(admin.ModelAdmin):
+class DocumentRequestAdmin(TransactionAdmin):
     list_display = ("reference_no", "student", "doc_type", "status", "requested_at")
-    list_filter = ("status", "doc_type")
-    search_fields = ("reference_no", "student__student_id", "student__user__username")
+    list_filter = ("status", ActiveDocumentTypeFilter)
+    list_select_related = ("student__user", "doc_type")
+    search_fields = ("reference_no",)
+    autocomplete_fields = ("student", "doc_type")
+    ordering = ("-requested_at",)
+    readonly_fields = ("claimed_by", "claimed_until")
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(TransactionAdmin):
     list_display = ("student", "office", "schedule", "status")
     list_filter = ("office", "status")
-    search_fields = ("student__student_id", "office", "topic")
+    list_select_related = ("student__user",)
+    search_fields = ("office", "topic")
+    readonly_fields = ("claimed_by", "claimed_until")
 
 @admin.register(FeePayment)
-class FeePaymentAdmin(admin.ModelAdmin):
+class FeePaymentAdmin(TransactionAdmin):
     list_display = ("student", "fee_name", "amount", "status", "paid_at")
     list_filter = ("status",)
-    search_fields = ("student__student_id", "fee_name", "reference")
+    list_select_related = ("student__user",)
+    search_fields = ("fee_name", "reference")
+    readonly_fields = ("claimed_by", "claimed_until")
 
 @admin.register(Inquiry)
-class InquiryAdmin(admin.ModelAdmin):
+class InquiryAdmin(TransactionAdmin):
     list_display = ("student", "subject", "status", "created_at")
     list_filter = ("status",)
-    search_fields = ("student__student_id", "subject")
+    list_select_related = ("student__user",)
+    search_fields = ("subject",)
+    autocomplete_fields = ("student", "replied_by")
+    readonly_fields = ("claimed_by", "claimed_until")
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import shards
+from .models import Appointment, ArchivedRecord, DocumentRequest, FeePayment, Inquiry
+
+
+def _request_row(obj):
+    return obj.reference_no, f"{obj.reference_no} • {obj.doc_type.name} • {obj.purpose}"
+
+
+def _appointment_row(obj):
+    return obj.office, f"{obj.office} • {obj.topic} • {obj.schedule:%Y-%m-%d %I:%M %p}"
+
+
+def _payment_row(obj):
+    return obj.reference, f"{obj.fee_name} • ₱{obj.amount} • Ref: {obj.reference or '-'}"
+
+
+def _inquiry_row(obj):
+    return obj.subject, obj.subject
+
+
+# model name -> (model, closed statuses, age field, select_related, row builder, child rows kept in the snapshot)
+POLICIES = {
+    "DocumentRequest": (DocumentRequest, ["RELEASED", "REJECTED"], "updated_at", ["doc_type"], _request_row, []),
+    "Appointment": (Appointment, ["DONE", "CANCELLED"], "schedule", [], _appointment_row, []),
+    # Proof rows go with the payment; their files stay, referenced from the snapshot.
+    "FeePayment": (FeePayment, ["VERIFIED"], "created_at", [], _payment_row, ["proofs"]),
+    "Inquiry": (Inquiry, ["CLOSED"], "created_at", [], _inquiry_row, []),
+}
+
+
+SEARCH_LIMIT = 100
+
+
+def _snapshot(obj, children=()):
+    data = {field.attname: field.value_to_string(obj) for field in obj._meta.concrete_fields}
+    for relation in children:
+        data[relation] = [_snapshot(child) for child in getattr(obj, relation).all()]
+    return data
+
+
+def archive_batch(name, cutoff, batch_size=500):
+    """Move one batch of closed rows older than ``cutoff`` into the archive.
+
+    The copy and the delete happen in the same transaction, so a row is never
+    lost or duplicated if the command is interrupted. Returns the number moved.
+    """
+    model, statuses, age_field, related, build, children = POLICIES[name]
+    with transaction.atomic(using=shards.alias()):
+        rows = list(
+            model.objects.filter(status__in=statuses, **{f"{age_field}__lt": cutoff})
+            .select_related(*related)
+            .prefetch_related(*children)
+            .order_by(age_field)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        records = []
+        for obj in rows:
+            reference, summary = build(obj)
+            records.append(
+                ArchivedRecord(
+                    model=name,
+                    original_id=obj.pk,
+                    student_id=obj.student_id,
+                    reference=reference[:160],
+                    status=obj.status,
+                    summary=summary[:255],
+                    data=_snapshot(obj, children),
+                    occurred_at=getattr(obj, age_field),
+                )
+            )
+        ArchivedRecord.objects.bulk_create(records, ignore_conflicts=True)
+        model.objects.filter(pk__in=[obj.pk for obj in rows]).delete()
+    return len(rows)
+
+
+def archive(name, days, batch_size=500, max_batches=None):
+    cutoff = timezone.now() - timedelta(days=days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(name, cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+    return moved
+
+
+def search(name, q="", status="", student=None, limit=SEARCH_LIMIT):
+    qs = ArchivedRecord.objects.filter(model=name)
+    if student is not None:
+        qs = qs.filter(student=student)
+    else:
+        qs = qs.select_related("student")
+    if status:
+        qs = qs.filter(status=status)
+    if q:
+        qs = qs.filter(Q(reference__icontains=q) | Q(summary__icontains=q) | Q(student__student_id__icontains=q))
+    return qs.order_by("-occurred_at")[:limit]
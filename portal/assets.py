@@ -0,0 +1,151 @@
+"""Static files: content-hashed, precompressed, served in-process.
+
+``collectstatic`` with ``CompressedManifestStorage`` copies every asset to
+STATIC_ROOT under a content-hashed name and writes a gzip (and, when the
+``brotli`` package is installed, a brotli) copy of each text asset next to it.
+``StaticFilesMiddleware`` serves STATIC_ROOT itself: it picks the smallest
+encoding the browser accepts and marks hashed files cacheable for a year,
+since any change to a file changes its URL.
+"""
+import gzip
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip copies are written
+    brotli = None
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map", ".ico")
+# Smaller files gain nothing worth the extra file.
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+# (encoding, file suffix), best first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write_if_smaller(path, data, original_size):
+    # Keep a compressed copy only if it saves at least 5%.
+    if len(data) < original_size * 0.95:
+        path.write_bytes(data)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def compress(path):
+    path = Path(path)
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+    _write_if_smaller(path.with_name(path.name + ".gz"), gzip.compress(data, 9, mtime=0), len(data))
+    if brotli is not None:
+        _write_if_smaller(path.with_name(path.name + ".br"), brotli.compress(data), len(data))
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes .gz/.br copies of every text asset it collects.
+
+    A file missing from the manifest (collectstatic not run yet, as in tests
+    and benchmarks) gets its plain, unhashed URL instead of failing the page.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = path.stat()
+        self.content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.cache_control = IMMUTABLE if immutable else f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60)}"
+        # (encoding, path, size, etag), best first; the plain file always comes last.
+        self.variants = []
+        for encoding, suffix in ENCODINGS:
+            compressed = path.with_name(path.name + suffix)
+            if compressed.exists():
+                size = compressed.stat().st_size
+                self.variants.append((encoding, compressed, size, f'"{stat.st_mtime_ns:x}-{size:x}-{encoding}"'))
+        self.variants.append((None, path, stat.st_size, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'))
+
+    def pick(self, accept_encoding):
+        for variant in self.variants:
+            if variant[0] is None or variant[0] in accept_encoding:
+                return variant
+
+
+def scan(root):
+    """URL path -> StaticFile for everything under ``root``, built once per process."""
+    root = Path(root)
+    prefix = "/" + settings.STATIC_URL.lstrip("/")
+    storage = CompressedManifestStorage(location=root)
+    hashed = set(storage.hashed_files.values())
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.endswith((".gz", ".br")) or name == storage.manifest_name:
+                continue
+            path = Path(dirpath) / name
+            relative = path.relative_to(root).as_posix()
+            files[prefix + relative] = StaticFile(path, relative in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Serves STATIC_ROOT before the rest of the stack, the way WhiteNoise does.
+
+    Files are indexed at startup, so a request costs a dict lookup and an
+    open(). Run collectstatic before starting the workers; files collected
+    later are picked up on the next restart. Paths not in the index fall
+    through to Django (and to the staticfiles app under runserver).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        root = getattr(settings, "STATIC_ROOT", None)
+        self.files = scan(root) if root and os.path.isdir(root) else {}
+
+    def __call__(self, request):
+        static = self.files.get(request.path_info)
+        if static is None:
+            return self.get_response(request)
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+
+        encoding, path, size, etag = static.pick(request.headers.get("Accept-Encoding", ""))
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponse(status=304)
+        else:
+            if request.method == "HEAD":
+                response = HttpResponse(content_type=static.content_type)
+            else:
+                response = FileResponse(path.open("rb"), content_type=static.content_type)
+                del response["Content-Disposition"]
+            response["Content-Length"] = str(size)
+            if encoding:
+                response["Content-Encoding"] = encoding
+            response["Last-Modified"] = static.last_modified
+        response["ETag"] = etag
+        response["Cache-Control"] = static.cache_control
+        response["Vary"] = "Accept-Encoding"
+        response["X-Content-Type-Options"] = "nosniff"
+        return response
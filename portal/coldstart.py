@@ -0,0 +1,59 @@
+"""Child process for ``manage.py profile_startup``.
+
+Run as ``python -X importtime -m portal.coldstart <request|jobs> <url>`` with
+DJANGO_SETTINGS_MODULE set. Boots Django the way a fresh worker does, serves
+one response, prints its timings as JSON on stdout and exits. Nothing from
+Django is imported at module level so the import log covers all of it.
+"""
+import json
+import sys
+import time
+
+
+def _request(url):
+    from io import BytesIO
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    path, _, query = url.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "localhost",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+    statuses = []
+    body = WSGIHandler()(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b"".join(body)
+    body.close()
+    return statuses[0].split()[0]
+
+
+def _jobs():
+    # What a job worker does before its first claim: load the task registry, read the queue.
+    from portal import jobs
+
+    return f"{jobs.queue_stats()['ready']} ready"
+
+
+def main():
+    started = time.perf_counter()
+    mode, url = sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "/"
+
+    import django
+
+    django.setup()
+    setup = time.perf_counter()
+    result = _jobs() if mode == "jobs" else _request(url)
+    done = time.perf_counter()
+
+    print(json.dumps({"setup_ms": (setup - started) * 1000, "first_ms": (done - setup) * 1000, "result": result}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
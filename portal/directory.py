@@ -0,0 +1,79 @@
+import re
+import unicodedata
+
+from django.db.models import Exists, OuterRef
+
+from .models import StudentProfile, StudentSearchTerm
+
+MAX_TOKENS = 4
+# Upper bound for a prefix range scan: every string starting with "abc" sorts below "abc" + this.
+PREFIX_END = "\U0010ffff"
+_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower()
+
+
+def tokenize(text):
+    return [token for token in _SPLIT.split(normalize(text)) if token]
+
+
+def terms_for(student_id, username="", first_name="", last_name=""):
+    """Index terms for one student: ID (whole and by segment) plus name tokens."""
+    terms = set(tokenize(student_id))
+    compact = "".join(tokenize(student_id))
+    if compact:
+        terms.add(compact)
+    for value in (username, first_name, last_name):
+        terms.update(tokenize(value))
+    return sorted(term[:150] for term in terms)
+
+
+def reindex(profile):
+    user = profile.user
+    StudentSearchTerm.objects.filter(student=profile).delete()
+    StudentSearchTerm.objects.bulk_create(
+        StudentSearchTerm(student=profile, term=term)
+        for term in terms_for(profile.student_id, user.username, user.first_name, user.last_name)
+    )
+
+
+def _prefix(token, **filters):
+    return StudentSearchTerm.objects.filter(term__gte=token, term__lt=token + PREFIX_END, **filters)
+
+
+def match_ids(query):
+    """Subquery of StudentProfile ids whose index terms prefix-match every query token.
+
+    The longest token is a range scan on (term, student); every other token is
+    an index probe on (student, term) for each candidate, so results stream out
+    in term order without materializing any token's full match set. Nothing
+    touches auth_user or does a leading-wildcard LIKE. Returns None for a
+    blank query.
+    """
+    tokens = tokenize(query)[:MAX_TOKENS]
+    if not tokens:
+        return None
+    # Drive from the longest (most selective) token, narrow by the rest.
+    tokens.sort(key=len, reverse=True)
+    qs = _prefix(tokens[0])
+    for token in tokens[1:]:
+        qs = qs.filter(Exists(_prefix(token, student_id=OuterRef("student_id"))))
+    return qs.values("student_id")
+
+
+def lookup(query, limit=10):
+    ids = match_ids(query)
+    if ids is None:
+        return []
+    first = []
+    for pk in ids.order_by("term", "student_id").values_list("student_id", flat=True)[: limit * 4]:
+        if pk not in first:
+            first.append(pk)
+        if len(first) == limit:
+            break
+    profiles = StudentProfile.objects.select_related("user").in_bulk(first)
+    return [profiles[pk] for pk in first if pk in profiles]
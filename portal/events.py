@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from django.core.handlers.asgi import ASGIRequest
+
+
+class Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, event):
+        if self.queue.full():
+            # Slow client: keep the newest events, the page only needs to know something changed.
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    """In-process fan-out of model change events to connected SSE clients.
+
+    Publishing is safe from any thread (sync views run in a thread pool under
+    ASGI); each subscriber receives events on its own event loop.
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        sub = Subscription(asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.push(event)
+            except RuntimeError:
+                # The subscriber's loop is gone (worker shutting down).
+                self.unsubscribe(sub)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+broker = Broker()
+
+
+def streaming(request):
+    """Whether ``request`` came in over ASGI, the only server that can hold an SSE stream open.
+
+    Under WSGI each open stream would pin a worker thread for good, so pages
+    leave the live-update banner out there.
+    """
+    return isinstance(request, ASGIRequest)
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from django.utils import timezone
+from . import shards
 from .models import StudentProfile, DocumentType, DocumentRequest, Appointment, FeePayment, Inquiry
 
 class RegisterForm(UserCreationForm):
@@ -12,6 +13,7 @@ class RegisterForm(UserCreationForm):
     course = forms.CharField(required=True)
     year_level = forms.IntegerField(min_value=1, max_value=6, required=True)
     contact_no = forms.CharField(required=False)
+    campus = forms.ChoiceField(choices=shards.choices)
 
     class Meta:
         model = User
@@ -20,6 +22,7 @@ class RegisterForm(UserCreationForm):
             "email",
             "first_name",
             "last_name",
+            "campus",
             "student_id",
             "course",
             "year_level",
@@ -28,6 +31,11 @@ class RegisterForm(UserCreationForm):
             "password2",
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if len(shards.campuses()) == 1:
+            del self.fields["campus"]
+
 class DocumentTypeForm(forms.ModelForm):
     class Meta:
         model = DocumentType
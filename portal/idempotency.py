@@ -0,0 +1,97 @@
+"""Idempotency keys for submission views.
+
+Create forms carry a one-time key (``idempotency_key`` field, or an
+``Idempotency-Key`` header from scripted clients). The first POST with a key
+claims it; once the view has redirected, the redirect is stored under the key
+for IDEMPOTENCY_TTL seconds. A retry of the same submission, whether a double
+click or a resend after a timeout, gets that redirect back without touching the
+form, the database or the rate limiter. A retry that arrives while the first
+POST is still running waits for it.
+
+Keys live in the Django cache, so processes share them when CACHES points at a
+shared backend; if the cache is unreachable each process keeps its own.
+"""
+import re
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponseBadRequest, HttpResponseRedirect
+
+from .ratelimit import LocalStore, too_busy_response
+
+FIELD = "idempotency_key"
+HEADER = "Idempotency-Key"
+PENDING = "p"
+# A claim outlives the slowest submission it guards; after that it is free again.
+PENDING_TTL = 60
+POLL_SECONDS = 0.05
+_VALID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+_local = LocalStore()
+
+
+def _call(method, *args):
+    try:
+        return getattr(cache, method)(*args)
+    except Exception:
+        # Cache backend unreachable: fall back to this process's own keys.
+        return getattr(_local, method)(*args)
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def key_for(request):
+    return request.headers.get(HEADER) or request.POST.get(FIELD, "")
+
+
+def _replay(request, value):
+    messages.info(request, "This form was already submitted; showing the original result.")
+    return HttpResponseRedirect(value)
+
+
+def idempotent(scope):
+    """Replay the stored redirect when a keyed POST to the view is retried.
+
+    Outermost on the view (inside ``login_required``) so replays skip
+    throttling and admission control.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = key_for(request) if request.method == "POST" else ""
+            if not key:
+                return view(request, *args, **kwargs)
+            if not _VALID.match(key):
+                return HttpResponseBadRequest("Malformed idempotency key.")
+
+            cache_key = f"idem:{scope}:{request.user.pk}:{key}"
+            deadline = time.monotonic() + getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 5.0)
+            while not _call("add", cache_key, PENDING, PENDING_TTL):
+                value = _call("get", cache_key)
+                if value not in (None, PENDING):
+                    return _replay(request, value)
+                if time.monotonic() >= deadline:
+                    return too_busy_response(request, 1)
+                time.sleep(POLL_SECONDS)
+
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                _call("delete", cache_key)
+                raise
+            if response.status_code in (301, 302, 303):
+                _call("set", cache_key, response["Location"], getattr(settings, "IDEMPOTENCY_TTL", 3600))
+            else:
+                # Invalid form, throttled, ...: nothing was created, so a retry should run again.
+                _call("delete", cache_key)
+            return response
+
+        return wrapper
+
+    return decorator
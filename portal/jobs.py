@@ -0,0 +1,160 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
+
+from . import shards
+from .models import Job
+
+TASKS = {}
+
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, delay=0, max_attempts=5, **payload):
+    """Queue a task to run once the current transaction commits.
+
+    Outside a transaction the job row is written immediately, so callers in
+    autocommit views and in atomic blocks can use it the same way. The task
+    runs in the campus it was queued from.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown task: {name}")
+
+    def create():
+        Job.objects.create(
+            task=name,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            campus=campus,
+        )
+
+    campus = shards.current()
+    transaction.on_commit(create, using=shards.alias())
+
+
+def _claimable():
+    now = timezone.now()
+    return Q(status="PENDING", run_at__lte=now) | Q(status="RUNNING", locked_until__lt=now)
+
+
+def claim(worker_id, limit=10, lease=60):
+    """Lease up to ``limit`` runnable jobs to ``worker_id``.
+
+    PostgreSQL uses ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers
+    never wait on each other. SQLite has no row locks, so candidates are read
+    first and then taken with a conditional UPDATE; rows another worker won in
+    between simply drop out of the update.
+    """
+    now = timezone.now()
+    until = now + timedelta(seconds=lease)
+    claim_fields = {
+        "status": "RUNNING",
+        "locked_by": worker_id,
+        "locked_until": until,
+        "attempts": F("attempts") + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                Job.objects.filter(_claimable())
+                .select_for_update(skip_locked=True)
+                .order_by("run_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            Job.objects.filter(id__in=ids).update(**claim_fields)
+    else:
+        ids = list(Job.objects.filter(_claimable()).order_by("run_at").values_list("id", flat=True)[:limit])
+        if ids:
+            Job.objects.filter(_claimable(), id__in=ids).update(**claim_fields)
+
+    if not ids:
+        return []
+    return list(Job.objects.filter(id__in=ids, status="RUNNING", locked_by=worker_id, locked_until=until))
+
+
+def backoff(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+def run_job(job, worker_id):
+    func = TASKS.get(job.task)
+    mine = Job.objects.filter(pk=job.pk, locked_by=worker_id)
+    try:
+        if func is None:
+            raise KeyError(f"Unknown task: {job.task}")
+        with shards.use(job.campus or None):
+            func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            mine.update(status="FAILED", last_error=error, locked_by="", locked_until=None, finished_at=timezone.now())
+        else:
+            mine.update(
+                status="PENDING",
+                last_error=error,
+                locked_by="",
+                locked_until=None,
+                run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        return False
+
+    mine.update(status="DONE", locked_by="", locked_until=None, finished_at=timezone.now())
+    return True
+
+
+class WorkerStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+
+    def record(self, ok):
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    @property
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return (self.done + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f"done={self.done} failed={self.failed} rate={self.throughput:.1f}/s"
+
+
+def work(worker_id, batch=10, lease=60, idle_sleep=1.0, once=False, stats=None):
+    stats = stats or WorkerStats()
+    while True:
+        jobs = claim(worker_id, limit=batch, lease=lease)
+        for job in jobs:
+            stats.record(run_job(job, worker_id))
+        if once and not jobs:
+            return stats
+        if not jobs:
+            time.sleep(idle_sleep)
+
+
+def queue_stats():
+    by_status = dict(Job.objects.values_list("status").annotate(total=Count("id")).order_by())
+    finished = Job.objects.filter(status="DONE", finished_at__isnull=False)
+    latency = finished.aggregate(avg=Avg(F("finished_at") - F("created_at")))["avg"]
+    return {
+        "by_status": by_status,
+        "ready": Job.objects.filter(_claimable()).count(),
+        "avg_latency": latency,
+    }
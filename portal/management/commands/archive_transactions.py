@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from portal import archive, shards
+
+
+class Command(BaseCommand):
+    help = "Move closed transactions older than the retention window into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "ARCHIVE_RETENTION_DAYS", 365),
+            help="Archive closed rows older than this many days.",
+        )
+        parser.add_argument("--batch", type=int, default=500, help="Rows moved per transaction.")
+        parser.add_argument(
+            "--model",
+            choices=sorted(archive.POLICIES),
+            action="append",
+            help="Limit to one model (repeatable). Defaults to all.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+        parser.add_argument("--campus", choices=list(shards.campuses()), help="Only this campus (default: every campus).")
+
+    def handle(self, *args, **options):
+        names = options["model"] or list(archive.POLICIES)
+        cutoff = timezone.now() - timedelta(days=options["days"])
+
+        for campus in shards.selected(options["campus"]):
+            with shards.use(campus):
+                for name in names:
+                    if options["dry_run"]:
+                        model, statuses, age_field, _, _, _ = archive.POLICIES[name]
+                        count = model.objects.filter(status__in=statuses, **{f"{age_field}__lt": cutoff}).count()
+                        self.stdout.write(f"{campus} {name}: {count} rows would be archived")
+                        continue
+
+                    moved = archive.archive(name, options["days"], batch_size=options["batch"])
+                    self.stdout.write(self.style.SUCCESS(f"{campus} {name}: archived {moved} rows"))
@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from portal import shards
+
+
+class Command(BaseCommand):
+    help = "Migrate the default and every campus database, then copy users and document types into the campus databases."
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+        hosts = {shards.database(campus): campus for campus in reversed(shards.campuses())}
+        for db in [DEFAULT_DB_ALIAS, *shards.campus_databases()]:
+            # Data migrations must read and write the database being migrated.
+            with shards.use(hosts.get(db)), shards.pinned(db):
+                call_command("migrate", database=db, interactive=False, verbosity=max(verbosity - 1, 0))
+            self.stdout.write(f"{db}: migrated")
+
+        for db in shards.campus_databases():
+            count = shards.sync_shared(db)
+            self.stdout.write(self.style.SUCCESS(f"{db}: {count} shared rows copied"))
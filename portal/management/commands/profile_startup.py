@@ -0,0 +1,93 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = {
+    "default": "config.settings",
+    "web": "config.profiles.web",
+    "worker": "config.profiles.worker",
+    "reporting": "config.profiles.reporting",
+}
+
+
+def _import_times(log):
+    """{module: cumulative microseconds} for top-level imports in a -X importtime log."""
+    times = {}
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class Command(BaseCommand):
+    help = "Measure cold start per settings profile: import time by module and time to first response."
+
+    def add_arguments(self, parser):
+        parser.add_argument("profiles", nargs="*", help="Profile names (%s) or settings modules. Default: all." % ", ".join(PROFILES))
+        parser.add_argument("--runs", type=int, default=5, help="Cold starts per profile; medians are reported.")
+        parser.add_argument("--url", default="/", help="Path requested by web profiles.")
+        parser.add_argument(
+            "--mode",
+            choices=["auto", "request", "jobs"],
+            default="auto",
+            help="First response to time: a GET of --url, or a job queue read. auto: jobs for worker profiles.",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list per profile.")
+
+    def _spawn(self, module, mode, url):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=module)
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-m", "portal.coldstart", mode, url],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        line = proc.stdout.readline()
+        ready = (time.perf_counter() - started) * 1000
+        _, log = proc.communicate()
+        if proc.returncode or not line:
+            raise CommandError(f"{module} failed to start:\n{log[-2000:]}")
+        result = json.loads(line)
+        result["cold_ms"] = ready
+        return result, log
+
+    def handle(self, *args, **options):
+        names = options["profiles"] or list(PROFILES)
+        modules = {name: PROFILES.get(name, name) for name in names}
+        runs = {name: [] for name in names}
+        imports = {}
+        # Interleave the profiles so machine load drifts affect them all alike. The first
+        # round only warms the OS page cache and bytecode caches and is not counted.
+        for round_no in range(options["runs"] + 1):
+            for name, module in modules.items():
+                mode = options["mode"]
+                if mode == "auto":
+                    mode = "jobs" if "worker" in module else "request"
+                result, log = self._spawn(module, mode, options["url"])
+                if round_no:
+                    runs[name].append(result)
+                    imports[name] = _import_times(log)
+
+        for name, module in modules.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({module}, first response: {runs[name][-1]['result']})"))
+            for module_name, micros in sorted(imports[name].items(), key=lambda item: -item[1])[: options["top"]]:
+                self.stdout.write(f"  {micros / 1000:8.1f} ms  {module_name}")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'profile':<12} {'cold start':>11} {'setup':>9} {'first':>9}   (medians of {options['runs']})")
+        for name in names:
+            median = {key: statistics.median(r[key] for r in runs[name]) for key in ("cold_ms", "setup_ms", "first_ms")}
+            self.stdout.write(f"{name:<12} {median['cold_ms']:9.0f}ms {median['setup_ms']:7.0f}ms {median['first_ms']:7.0f}ms")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from portal import shards, suggestions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the inquiry similarity index, re-weighting every term against the current corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campus", choices=list(shards.campuses()), help="Only this campus (default: every campus).")
+
+    def handle(self, *args, **options):
+        for campus in shards.selected(options["campus"]):
+            with shards.use(campus):
+                count = suggestions.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"{campus}: indexed {count} inquiries"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from portal import shards, summaries
+from portal.models import StudentProfile
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student activity summary rows from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campus", choices=list(shards.campuses()), help="Only this campus (default: every campus).")
+
+    def handle(self, *args, **options):
+        for campus in shards.selected(options["campus"]):
+            count = 0
+            with shards.use(campus):
+                for pk in StudentProfile.objects.values_list("pk", flat=True).iterator():
+                    summaries.refresh(pk)
+                    count += 1
+            self.stdout.write(self.style.SUCCESS(f"{campus}: rebuilt {count} student summaries"))
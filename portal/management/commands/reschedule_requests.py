@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from portal import shards, sla
+from portal.models import DocumentRequest
+
+
+class Command(BaseCommand):
+    help = "Recompute request due dates, e.g. after changing SLA_HOLIDAYS or a document type's processing days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Include closed requests, not just pending/approved ones.")
+        parser.add_argument("--doc-type", type=int, action="append", help="Limit to one document type id (repeatable).")
+        parser.add_argument("--batch", type=int, default=500, help="Most rows updated per statement.")
+        parser.add_argument("--campus", choices=list(shards.campuses()), help="Only this campus (default: every campus).")
+
+    def handle(self, *args, **options):
+        for campus in shards.selected(options["campus"]):
+            with shards.use(campus):
+                qs = DocumentRequest.objects.all()
+                if not options["all"]:
+                    qs = qs.filter(status__in=sla.OPEN_STATUSES)
+                if options["doc_type"]:
+                    qs = qs.filter(doc_type__in=options["doc_type"])
+                count = sla.reschedule(qs, batch_size=options["batch"])
+            self.stdout.write(self.style.SUCCESS(f"{campus}: rescheduled {count} requests"))
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from portal import jobs
+
+
+def _worker(worker_id, options, stdout):
+    connections.close_all()
+    stats = jobs.WorkerStats()
+    try:
+        while True:
+            try:
+                jobs.work(
+                    worker_id,
+                    batch=options["batch"],
+                    lease=options["lease"],
+                    idle_sleep=options["sleep"],
+                    once=options["once"],
+                    stats=stats,
+                )
+                break
+            except OperationalError:
+                # SQLite writer lock contention between worker processes; back off and retry.
+                close_old_connections()
+                time.sleep(options["sleep"])
+    except KeyboardInterrupt:
+        pass
+    stdout.write(f"[{worker_id}] {stats}")
+    # Worker processes exit without flushing their buffers.
+    stdout.flush()
+
+
+class Command(BaseCommand):
+    help = "Run background jobs queued by the portal (status notices and email digests, PDF slips and receipts, proof thumbnails, due-date rescheduling)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per round trip.")
+        parser.add_argument("--lease", type=int, default=60, help="Seconds a claimed job stays reserved.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Idle poll interval in seconds.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+        parser.add_argument("--stats", action="store_true", help="Print queue metrics and exit.")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            stats = jobs.queue_stats()
+            for status, total in sorted(stats["by_status"].items()):
+                self.stdout.write(f"{status}: {total}")
+            self.stdout.write(f"ready: {stats['ready']}")
+            self.stdout.write(f"avg latency: {stats['avg_latency']}")
+            return
+
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        started = time.monotonic()
+
+        if options["workers"] <= 1:
+            _worker(f"{prefix}-0", options, self.stdout)
+        else:
+            connections.close_all()
+            procs = [
+                multiprocessing.Process(target=_worker, args=(f"{prefix}-{n}", options, self.stdout))
+                for n in range(options["workers"])
+            ]
+            for proc in procs:
+                proc.start()
+            try:
+                for proc in procs:
+                    proc.join()
+            except KeyboardInterrupt:
+                for proc in procs:
+                    proc.join()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Workers stopped after {elapsed:.1f}s"))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from portal import notifications, shards
+
+
+class Command(BaseCommand):
+    help = "Send batched notification digests to students."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=None,
+            help="Only include events older than this many seconds (default: NOTIFICATION_DIGEST_WINDOW).",
+        )
+        parser.add_argument("--campus", choices=list(shards.campuses()), help="Only this campus (default: every campus).")
+
+    def handle(self, *args, **options):
+        window = None if options["window"] is None else timedelta(seconds=options["window"])
+        for campus in shards.selected(options["campus"]):
+            with shards.use(campus):
+                stats = notifications.flush_digests(window=window)
+            self.stdout.write(
+                f"{campus}: {stats['events']} events -> {stats['digests']} digests "
+                f"({stats['coalesced']} coalesced), {stats['sent']} sent in {stats['seconds']:.2f}s "
+                f"({stats['rate']:.1f}/s)"
+            )
@@ -0,0 +1,219 @@
+"""Per-view request metrics, shared across worker processes through files.
+
+Each process counts into one pair of dicts under a lock held only for the
+few additions. At most once per METRICS_FLUSH_INTERVAL a process rewrites
+its own snapshot file in METRICS_DIR; the metrics view adds up every
+process's file. Files of exited workers are kept so counters never go
+backwards; clear the directory when deploying.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Histogram upper bounds in seconds; the implicit last bucket is +Inf.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Per-view row: one count per bucket, +Inf, then total seconds, DB seconds, queries, template seconds.
+INF, SECONDS, DB_SECONDS, QUERIES, TEMPLATE_SECONDS = range(len(BUCKETS), len(BUCKETS) + 5)
+ROW_SIZE = TEMPLATE_SECONDS + 1
+# Methods recorded by name; anything else a client sends counts as "other",
+# so clients can't create new series.
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"})
+
+_local = threading.local()
+_lock = threading.Lock()
+_requests = {}
+_views = {}
+_started = int(time.time())
+_last_flush = 0.0
+
+
+def metrics_dir():
+    return Path(getattr(settings, "METRICS_DIR", Path(settings.BASE_DIR) / "var" / "metrics"))
+
+
+def request_timing():
+    """The timing dict of the request this thread is serving, or None."""
+    return getattr(_local, "timing", None)
+
+
+def record(view, method, status, seconds, db_seconds, queries, template_seconds):
+    bucket = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), None)
+    key = (view, method, status)
+    with _lock:
+        _requests[key] = _requests.get(key, 0) + 1
+        row = _views.get(view)
+        if row is None:
+            row = _views[view] = [0] * ROW_SIZE
+        if bucket is not None:
+            row[bucket] += 1
+        row[INF] += 1
+        row[SECONDS] += seconds
+        row[DB_SECONDS] += db_seconds
+        row[QUERIES] += queries
+        row[TEMPLATE_SECONDS] += template_seconds
+
+
+def snapshot():
+    """This process's totals."""
+    with _lock:
+        return Counter(_requests), {view: list(row) for view, row in _views.items()}
+
+
+def flush():
+    global _last_flush
+    _last_flush = time.monotonic()
+    requests, views = snapshot()
+    data = {"requests": [[*key, count] for key, count in requests.items()], "views": views}
+    target = metrics_dir() / f"{os.getpid()}-{_started}.json"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, target)
+
+
+def maybe_flush():
+    if time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0):
+        flush()
+
+
+def collect():
+    """Totals across every process that has written a snapshot (this one included)."""
+    flush()
+    requests = Counter()
+    views = {}
+    for path in metrics_dir().glob("*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # replaced or removed while we were reading it
+        for view, method, status, count in data["requests"]:
+            requests[(view, method, status)] += count
+        for view, row in data["views"].items():
+            total = views.setdefault(view, [0] * ROW_SIZE)
+            for i, value in enumerate(row):
+                total[i] += value
+    return requests, views
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(requests, views):
+    """Prometheus text exposition format."""
+    out = [
+        "# HELP portal_http_requests_total Requests by URL name, method and status code.",
+        "# TYPE portal_http_requests_total counter",
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        out.append(f'portal_http_requests_total{{view="{_label(view)}",method="{_label(method)}",status="{_label(status)}"}} {count}')
+
+    out += [
+        "# HELP portal_http_request_duration_seconds Time from the request entering Django to the response leaving it.",
+        "# TYPE portal_http_request_duration_seconds histogram",
+    ]
+    for view, row in sorted(views.items()):
+        name = _label(view)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, row):
+            cumulative += count
+            out.append(f'portal_http_request_duration_seconds_bucket{{view="{name}",le="{bound}"}} {cumulative}')
+        out.append(f'portal_http_request_duration_seconds_bucket{{view="{name}",le="+Inf"}} {row[INF]}')
+        out.append(f'portal_http_request_duration_seconds_sum{{view="{name}"}} {row[SECONDS]:.6f}')
+        out.append(f'portal_http_request_duration_seconds_count{{view="{name}"}} {row[INF]}')
+
+    for metric, index, kind, help_text in (
+        ("portal_db_seconds_total", DB_SECONDS, "counter", "Time spent in database queries."),
+        ("portal_db_queries_total", QUERIES, "counter", "Database queries run."),
+        ("portal_template_seconds_total", TEMPLATE_SECONDS, "counter", "Time spent rendering templates."),
+    ):
+        out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for view, row in sorted(views.items()):
+            value = row[index]
+            out.append(f'{metric}{{view="{_label(view)}"}} {value:.6f}' if isinstance(value, float) else f'{metric}{{view="{_label(view)}"}} {value}')
+    return "\n".join(out) + "\n"
+
+
+class _DbTimer:
+    def __init__(self, timing):
+        self.timing = timing
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timing["db"] += time.perf_counter() - started
+            self.timing["queries"] += 1
+
+
+@contextmanager
+def track_queries(timing):
+    """Add the time and count of this thread's queries inside the block to ``timing``."""
+    with ExitStack() as stack:
+        timer = _DbTimer(timing)
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        yield
+
+
+class MetricsMiddleware:
+    """Times every request and files it under its URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = _local.timing = {"db": 0.0, "queries": 0, "template": 0.0}
+        started = time.perf_counter()
+        try:
+            with track_queries(timing):
+                response = self.get_response(request)
+        finally:
+            _local.timing = None
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unmatched>"
+        method = request.method if request.method in METHODS else "other"
+        record(view, method, response.status_code, time.perf_counter() - started, timing["db"], timing["queries"], timing["template"])
+        maybe_flush()
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = request_timing()
+        if timing is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing["template"] += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time added to the current request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+atexit.register(lambda: _requests and flush())
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_work_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=40)),
+                ('original_id', models.PositiveBigIntegerField()),
+                ('reference', models.CharField(blank=True, max_length=160)),
+                ('status', models.CharField(max_length=20)),
+                ('summary', models.CharField(max_length=255)),
+                ('data', models.JSONField(default=dict)),
+                ('occurred_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_records', to='portal.studentprofile')),
+            ],
+            options={
+                'ordering': ['-occurred_at'],
+                'indexes': [models.Index(fields=['model', 'student', 'occurred_at'], name='portal_arch_model_5c562a_idx'), models.Index(fields=['model', 'status', 'occurred_at'], name='portal_arch_model_bc3eb1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedrecord',
+            constraint=models.UniqueConstraint(fields=('model', 'original_id'), name='unique_archived_record'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_archivedrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentrequest',
+            name='reference_no',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+    ]
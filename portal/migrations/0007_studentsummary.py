@@ -0,0 +1,29 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0006_longer_reference_no'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSummary',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='portal.studentprofile')),
+                ('open_requests', models.PositiveIntegerField(default=0)),
+                ('pending_payments', models.PositiveIntegerField(default=0)),
+                ('pending_payment_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('upcoming_appointments', models.PositiveIntegerField(default=0)),
+                ('next_appointment', models.DateTimeField(blank=True, null=True)),
+                ('unanswered_inquiries', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('recent', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
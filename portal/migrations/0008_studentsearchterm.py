@@ -0,0 +1,63 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:49
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The term rules as of this migration (portal.directory.terms_for at the time);
+# kept here so later changes to the app code don't change this migration.
+_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _tokenize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [token for token in _SPLIT.split(text) if token]
+
+
+def _terms_for(student_id, username, first_name, last_name):
+    terms = set(_tokenize(student_id))
+    compact = "".join(_tokenize(student_id))
+    if compact:
+        terms.add(compact)
+    for value in (username, first_name, last_name):
+        terms.update(_tokenize(value))
+    return sorted(term[:150] for term in terms)
+
+
+def build_index(apps, schema_editor):
+    StudentProfile = apps.get_model("portal", "StudentProfile")
+    StudentSearchTerm = apps.get_model("portal", "StudentSearchTerm")
+    batch = []
+    for profile in StudentProfile.objects.select_related("user").iterator():
+        user = profile.user
+        for term in _terms_for(profile.student_id, user.username, user.first_name, user.last_name):
+            batch.append(StudentSearchTerm(student_id=profile.pk, term=term))
+        if len(batch) >= 5000:
+            StudentSearchTerm.objects.bulk_create(batch)
+            batch = []
+    StudentSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_studentsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=150)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='portal.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'student'], name='portal_stud_term_0f31d8_idx'), models.Index(fields=['student', 'term'], name='portal_stud_student_b68178_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
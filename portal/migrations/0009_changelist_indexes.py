@@ -0,0 +1,51 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_studentsearchterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['schedule'], name='portal_appo_schedul_da613f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['office'], name='portal_appo_office_7bd456_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['topic'], name='portal_appo_topic_aae866_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentrequest',
+            index=models.Index(fields=['requested_at'], name='portal_docu_request_7bef98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['paid_at'], name='portal_feep_paid_at_cc1f9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['fee_name'], name='portal_feep_fee_nam_f568ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['reference'], name='portal_feep_referen_c9ec90_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['created_at'], name='portal_inqu_created_32c70a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['subject'], name='portal_inqu_subject_ef10e8_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0009_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feepayment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
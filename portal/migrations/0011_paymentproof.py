@@ -0,0 +1,30 @@
+# Generated by Django 5.0.8 on 2026-10-19 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0010_feepayment_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentProof',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveIntegerField()),
+                ('content_type', models.CharField(max_length=50)),
+                ('original_name', models.CharField(max_length=200)),
+                ('has_thumbnail', models.BooleanField(default=False)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proofs', to='portal.feepayment')),
+            ],
+            options={
+                'ordering': ['uploaded_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.8 on 2026-10-19 17:44
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# The due-date rules as of this migration (portal.sla at the time), kept here
+# so later changes to the app code don't change this migration.
+
+
+def _setting_time(value):
+    return value if isinstance(value, datetime.time) else datetime.time.fromisoformat(value)
+
+
+def _setting_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+
+def schedule_existing(apps, schema_editor):
+    DocumentRequest = apps.get_model("portal", "DocumentRequest")
+    weekend = getattr(settings, "SLA_WEEKEND", (5, 6))
+    holidays = frozenset(_setting_date(day) for day in getattr(settings, "SLA_HOLIDAYS", ()))
+    closing_time = _setting_time(getattr(settings, "SLA_CLOSING_TIME", "17:00"))
+
+    def is_business_day(day):
+        return day.weekday() not in weekend and day not in holidays
+
+    def due(day, days):
+        while not is_business_day(day):
+            day += datetime.timedelta(days=1)
+        while days > 0:
+            day += datetime.timedelta(days=1)
+            if is_business_day(day):
+                days -= 1
+        return timezone.make_aware(datetime.datetime.combine(day, closing_time))
+
+    # Requests filed on the same day for the same processing time share a due
+    # time: one UPDATE per group.
+    groups = {}
+    rows = DocumentRequest.objects.order_by().values_list("pk", "requested_at", "doc_type__processing_days")
+    for pk, requested_at, days in rows.iterator(chunk_size=2000):
+        groups.setdefault((timezone.localtime(requested_at).date(), days), []).append(pk)
+    for (day, days), pks in groups.items():
+        at = due(day, days)
+        for i in range(0, len(pks), 500):
+            DocumentRequest.objects.filter(pk__in=pks[i:i + 500]).update(due_at=at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0011_paymentproof'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentrequest',
+            name='due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='documentrequest',
+            index=models.Index(fields=['status', 'due_at'], name='portal_docu_status_e8a033_idx'),
+        ),
+        migrations.RunPython(schedule_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.8 on 2026-10-19 18:04
+
+import math
+import re
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Inquiry terms and weights as computed by portal.suggestions when this
+# migration was written. Copied in so the migration keeps working however
+# that module changes later.
+_SPLIT = re.compile(r"[^0-9a-z]+")
+_STOPWORDS = frozenset(
+    """
+    a about am an and any are as at be been but by can could did do does for from get got had has have hello hi how
+    i if in into is it its just me my no not now of on or our please so thank thanks that the their them then there
+    these this to too was we were what when where which who why will with would yes you your
+    ako ang ba din lang mag na naman ng ni nila niyo po sa si sana yung
+    """.split()
+)
+
+
+def _tokenize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [token for token in _SPLIT.split(text) if token]
+
+
+def _term_counts(subject, message):
+    counts = Counter()
+    for text, weight in ((subject, 2), (message, 1)):
+        for token in _tokenize(text):
+            if len(token) > 1 and not token.isdigit() and token not in _STOPWORDS:
+                if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+                    token = token[:-1]
+                counts[token[:40]] += weight
+    return counts
+
+
+def _weigh(counts, document_frequency, total):
+    weights = {
+        term: (1 + math.log(count)) * (math.log((total + 1) / (document_frequency.get(term, 1) + 1)) + 1)
+        for term, count in counts.items()
+    }
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+
+def build_index(apps, schema_editor):
+    Inquiry = apps.get_model("portal", "Inquiry")
+    InquiryTerm = apps.get_model("portal", "InquiryTerm")
+    rows = Inquiry.objects.order_by().values_list("pk", "subject", "message", "status", "reply")
+    document_frequency = Counter()
+    total = 0
+    for _, subject, message, _, _ in rows.iterator(chunk_size=2000):
+        document_frequency.update(_term_counts(subject, message).keys())
+        total += 1
+
+    batch = []
+    for pk, subject, message, status, reply in rows.iterator(chunk_size=2000):
+        answered = status in ("ANSWERED", "CLOSED") and bool(reply)
+        for term, w in _weigh(_term_counts(subject, message), document_frequency, total).items():
+            batch.append(InquiryTerm(inquiry_id=pk, term=term, weight=w, answered=answered))
+        if len(batch) >= 5000:
+            InquiryTerm.objects.bulk_create(batch)
+            batch = []
+    InquiryTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0012_documentrequest_due_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.FloatField()),
+                ('answered', models.BooleanField(default=False)),
+                ('inquiry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='portal.inquiry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'inquiry', 'answered'], name='portal_inqu_term_aeef69_idx'), models.Index(fields=['inquiry', 'term'], name='portal_inqu_inquiry_17f84b_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.8 on 2026-10-19 18:14
+
+import portal.shards
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0013_inquiryterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='campus',
+            field=models.CharField(default=portal.shards.current, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='documentrequest',
+            name='campus',
+            field=models.CharField(default=portal.shards.current, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='feepayment',
+            name='campus',
+            field=models.CharField(default=portal.shards.current, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='campus',
+            field=models.CharField(default=portal.shards.current, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='campus',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='campus',
+            field=models.CharField(default=portal.shards.current, editable=False, max_length=20),
+        ),
+    ]
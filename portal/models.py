@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
+from django.utils.crypto import get_random_string
 from django.core.validators import MinLengthValidator
 
+from . import shards, sla
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     student_id = models.CharField(max_length=20, unique=True, validators=[MinLengthValidator(5)])
@@ -10,10 +13,39 @@ class StudentProfile(models.Model):
     year_level = models.PositiveSmallIntegerField(default=1)
     contact_no = models.CharField(max_length=30, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    campus = models.CharField(max_length=20, default=shards.current, editable=False)
 
     def __str__(self):
         return f"{self.student_id} - {self.user.get_full_name() or self.user.username}"
 
+class StudentSearchTerm(models.Model):
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="search_terms")
+    term = models.CharField(max_length=150)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "student"]),
+            models.Index(fields=["student", "term"]),
+        ]
+
+    def __str__(self):
+        return self.term
+
+class StudentSummary(models.Model):
+    student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    open_requests = models.PositiveIntegerField(default=0)
+    pending_payments = models.PositiveIntegerField(default=0)
+    pending_payment_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    upcoming_appointments = models.PositiveIntegerField(default=0)
+    next_appointment = models.DateTimeField(null=True, blank=True)
+    unanswered_inquiries = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+    recent = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary for {self.student_id}"
+
 class DocumentType(models.Model):
     name = models.CharField(max_length=120, unique=True)
     fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -31,7 +63,7 @@ class DocumentRequest(models.Model):
         ("RELEASED", "Released"),
     ]
 
-    reference_no = models.CharField(max_length=14, unique=True, editable=False)
+    reference_no = models.CharField(max_length=20, unique=True, editable=False)
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="document_requests")
     doc_type = models.ForeignKey(DocumentType, on_delete=models.PROTECT)
     purpose = models.CharField(max_length=200)
@@ -39,11 +71,32 @@ class DocumentRequest(models.Model):
     remarks = models.TextField(blank=True)
     requested_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    campus = models.CharField(max_length=20, default=shards.current, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "requested_at"]),
+            models.Index(fields=["requested_at"]),
+            models.Index(fields=["status", "due_at"]),
+        ]
+
+    @staticmethod
+    def make_reference():
+        # The random suffix keeps references unique when many requests land in the same second.
+        stamp = timezone.now().strftime("%y%m%d%H%M%S")
+        return f"DR{stamp}{get_random_string(4, 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789')}"
+
+    def schedule(self):
+        self.due_at = sla.due_at(self.requested_at or timezone.now(), self.doc_type.processing_days)
 
     def save(self, *args, **kwargs):
         if not self.reference_no:
-            stamp = timezone.now().strftime("%y%m%d%H%M%S")
-            self.reference_no = f"DR{stamp}"
+            self.reference_no = self.make_reference()
+        if self.due_at is None:
+            self.schedule()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -64,9 +117,18 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    campus = models.CharField(max_length=20, default=shards.current, editable=False)
 
     class Meta:
         ordering = ["-schedule"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["schedule"]),
+            models.Index(fields=["office"]),
+            models.Index(fields=["topic"]),
+        ]
 
     def __str__(self):
         return f"{self.office} - {self.schedule:%Y-%m-%d %I:%M %p}"
@@ -86,13 +148,38 @@ class FeePayment(models.Model):
     admin_note = models.TextField(blank=True)
     paid_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    campus = models.CharField(max_length=20, default=shards.current, editable=False)
 
     class Meta:
         ordering = ["-paid_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["paid_at"]),
+            models.Index(fields=["fee_name"]),
+            models.Index(fields=["reference"]),
+        ]
 
     def __str__(self):
         return f"{self.fee_name} - {self.student.student_id}"
 
+class PaymentProof(models.Model):
+    payment = models.ForeignKey(FeePayment, on_delete=models.CASCADE, related_name="proofs")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveIntegerField()
+    content_type = models.CharField(max_length=50)
+    original_name = models.CharField(max_length=200)
+    has_thumbnail = models.BooleanField(default=False)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["uploaded_at"]
+
+    def __str__(self):
+        return self.original_name
+
 class Inquiry(models.Model):
     STATUS_CHOICES = [
         ("OPEN", "Open"),
@@ -108,9 +195,107 @@ class Inquiry(models.Model):
     replied_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="replies")
     created_at = models.DateTimeField(auto_now_add=True)
     replied_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    campus = models.CharField(max_length=20, default=shards.current, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["subject"]),
+        ]
 
     def __str__(self):
         return self.subject
+
+class InquiryTerm(models.Model):
+    inquiry = models.ForeignKey(Inquiry, on_delete=models.CASCADE, related_name="terms")
+    term = models.CharField(max_length=40)
+    weight = models.FloatField()
+    # Copied from the inquiry so candidate lookups never have to join it.
+    answered = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "inquiry", "answered"]),
+            models.Index(fields=["inquiry", "term"]),
+        ]
+
+    def __str__(self):
+        return self.term
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    task = models.CharField(max_length=120)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Campus the job was queued in; it runs there.
+    campus = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["run_at"]
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+            models.Index(fields=["status", "locked_until"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+class Notification(models.Model):
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="notifications")
+    model = models.CharField(max_length=40)
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=20)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["sent_at", "created_at"]),
+        ]
+
+    def __str__(self):
+        return self.message
+
+class ArchivedRecord(models.Model):
+    model = models.CharField(max_length=40)
+    original_id = models.PositiveBigIntegerField()
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name="archived_records")
+    reference = models.CharField(max_length=160, blank=True)
+    status = models.CharField(max_length=20)
+    summary = models.CharField(max_length=255)
+    data = models.JSONField(default=dict)
+    occurred_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-occurred_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["model", "original_id"], name="unique_archived_record"),
+        ]
+        indexes = [
+            models.Index(fields=["model", "student", "occurred_at"]),
+            models.Index(fields=["model", "status", "occurred_at"]),
+        ]
+
+    def __str__(self):
+        return self.summary
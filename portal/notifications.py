@@ -0,0 +1,126 @@
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from . import jobs, shards
+from .models import Job, Notification
+
+
+def digest_window():
+    return timedelta(seconds=getattr(settings, "NOTIFICATION_DIGEST_WINDOW", 300))
+
+
+def record(student, model, object_id, status, message):
+    """Store a status event and make sure a digest flush is scheduled for it."""
+    Notification.objects.create(student=student, model=model, object_id=object_id, status=status, message=message)
+    schedule_flush(digest_window().total_seconds())
+
+
+def schedule_flush(delay):
+    due = timezone.now() + timedelta(seconds=delay)
+    # One pending flush covers every student of the campus; only add another if none would run in time.
+    pending = Job.objects.filter(task="portal.flush_digests", campus=shards.current(), status="PENDING", run_at__lte=due)
+    if not pending.exists():
+        jobs.enqueue("portal.flush_digests", delay=delay)
+
+
+def _build_digest(student, events):
+    # Several changes to the same item inside one window collapse to the latest status.
+    latest = OrderedDict()
+    for event in events:
+        latest.pop((event.model, event.object_id), None)
+        latest[(event.model, event.object_id)] = event
+
+    user = student.user
+    lines = [f"- {event.message}" for event in latest.values()]
+    body = (
+        f"Hi {user.get_full_name() or user.username},\n\n"
+        "Here are the latest updates on your transactions:\n\n"
+        + "\n".join(lines)
+        + "\n\nLog in to the portal for details.\n"
+    )
+    subject = "CVSU Bacoor Portal: 1 update" if len(lines) == 1 else f"CVSU Bacoor Portal: {len(lines)} updates"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def _mark_sent(events):
+    Notification.objects.filter(pk__in=[event.pk for event in events]).update(sent_at=timezone.now())
+
+
+def _send_batch(connection, digests):
+    """Send ``[(message, events)]`` over the open connection; returns the number delivered.
+
+    Events are marked sent once their batch is done, and only for the digests
+    the backend reports as delivered, so a failure partway through neither
+    resends what already went out nor drops what didn't.
+    """
+    delivered = []
+    sent = 0
+    try:
+        for message, events in digests:
+            if connection.send_messages([message]):
+                delivered.extend(events)
+                sent += 1
+    finally:
+        _mark_sent(delivered)
+    return sent
+
+
+def flush_digests(window=None, connection=None):
+    """Send one email per student for every event older than the digest window.
+
+    All digests go out over a single mail connection, in batches of
+    ``NOTIFICATION_BATCH_SIZE``, instead of one SMTP session per event.
+    Events whose digest was not delivered stay pending for the next run.
+    Returns counters for the run.
+    """
+    window = digest_window() if window is None else window
+    batch_size = getattr(settings, "NOTIFICATION_BATCH_SIZE", 100)
+    started = time.monotonic()
+    cutoff = timezone.now() - window
+
+    due_students = (
+        Notification.objects.filter(sent_at__isnull=True, created_at__lte=cutoff)
+        .values_list("student_id", flat=True)
+        .distinct()
+    )
+    pending = list(
+        Notification.objects.filter(sent_at__isnull=True, student_id__in=list(due_students))
+        .select_related("student__user")
+        .order_by("student_id", "created_at")
+    )
+
+    grouped = OrderedDict()
+    for event in pending:
+        grouped.setdefault(event.student_id, []).append(event)
+
+    digests = []
+    unreachable = []
+    for events in grouped.values():
+        student = events[0].student
+        if student.user.email:
+            digests.append((_build_digest(student, events), events))
+        else:
+            unreachable.extend(events)
+    # Nowhere to send these; don't keep picking them up.
+    _mark_sent(unreachable)
+
+    sent = 0
+    connection = connection or get_connection()
+    with connection:
+        for i in range(0, len(digests), batch_size):
+            sent += _send_batch(connection, digests[i:i + batch_size])
+
+    elapsed = time.monotonic() - started
+    return {
+        "events": len(pending),
+        "digests": len(digests),
+        "coalesced": len(pending) - len(digests),
+        "sent": sent,
+        "seconds": elapsed,
+        "rate": sent / elapsed if elapsed > 0 else 0.0,
+    }
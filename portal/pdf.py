@@ -0,0 +1,65 @@
+"""Minimal single-page PDF writer for slips and receipts.
+
+Text only, in the built-in Helvetica fonts, so there is nothing to install or
+embed. Output is deterministic: the same lines always give the same bytes.
+"""
+import textwrap
+import zlib
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 56
+FONTS = {"regular": "/F1", "bold": "/F2"}
+
+
+def _escape(text):
+    raw = str(text).encode("cp1252", "replace").decode("latin-1")
+    return raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _content(lines):
+    ops = ["BT"]
+    y = PAGE_HEIGHT - MARGIN
+    for line in lines:
+        size = line.get("size", 11)
+        x = MARGIN + line.get("indent", 0)
+        font = FONTS[line.get("font", "regular")]
+        # Helvetica averages about half an em per character; wrap to the page width on that.
+        width = int((PAGE_WIDTH - MARGIN - x) / (size * 0.5))
+        for i, part in enumerate(textwrap.wrap(" ".join(str(line["text"]).split()), width) or [""]):
+            y -= line.get("space", size + 6) if i == 0 else size + 4
+            ops.append(f"{font} {size} Tf 1 0 0 1 {x} {y} Tm ({_escape(part)}) Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def render(lines):
+    """Build a one-page PDF from ``lines``.
+
+    Each line is a dict with ``text`` and optionally ``font`` ("regular" or
+    "bold"), ``size`` (points), ``indent`` and ``space`` (points below the
+    previous line).
+    """
+    stream = zlib.compress(_content(lines))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            "/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import pdf, shards
+from .models import DocumentRequest, FeePayment
+
+# Bump when a layout changes so every cached file is rendered again.
+LAYOUT_VERSION = 1
+UNIVERSITY = "Cavite State University"
+
+
+def _when(value):
+    return timezone.localtime(value).strftime("%b %d, %Y %I:%M %p") if value else "-"
+
+
+def _student_name(student):
+    return student.user.get_full_name() or student.user.username
+
+
+def _header(obj):
+    return f"{UNIVERSITY} - {shards.name(obj.campus)}"
+
+
+def _claim_slip(obj):
+    return [
+        {"text": _header(obj), "font": "bold", "size": 14},
+        {"text": "Document Claim Slip", "size": 12},
+        {"text": f"Reference No.: {obj.reference_no}", "font": "bold", "space": 36},
+        {"text": f"Student: {obj.student.student_id} - {_student_name(obj.student)}"},
+        {"text": f"Document: {obj.doc_type.name}"},
+        {"text": f"Purpose: {obj.purpose}"},
+        {"text": f"Fee: PHP {obj.doc_type.fee}"},
+        {"text": f"Requested: {_when(obj.requested_at)}"},
+        {"text": f"Released: {_when(obj.updated_at)}"},
+        {"text": f"Remarks: {obj.remarks or '-'}"},
+        {"text": "Present this slip and a valid ID at the Registrar's Office to claim your document.", "size": 9, "space": 40},
+    ]
+
+
+def _receipt(obj):
+    return [
+        {"text": _header(obj), "font": "bold", "size": 14},
+        {"text": "Payment Receipt", "size": 12},
+        {"text": f"Receipt No.: FP{obj.pk:08d}", "font": "bold", "space": 36},
+        {"text": f"Student: {obj.student.student_id} - {_student_name(obj.student)}"},
+        {"text": f"Fee: {obj.fee_name}"},
+        {"text": f"Amount: PHP {obj.amount}"},
+        {"text": f"Payment reference: {obj.reference or '-'}"},
+        {"text": f"Paid: {_when(obj.paid_at)}"},
+        {"text": f"Verified: {_when(obj.updated_at)}"},
+        {"text": "This receipt acknowledges a payment verified by the Cashier's Office.", "size": 9, "space": 40},
+    ]
+
+
+# model -> (status that makes it printable, file name prefix, layout, related rows the layout reads)
+PRINTABLE = {
+    DocumentRequest: ("RELEASED", "claim-slip", _claim_slip, ("student__user", "doc_type")),
+    FeePayment: ("VERIFIED", "receipt", _receipt, ("student__user",)),
+}
+
+
+def storage_dir():
+    return Path(getattr(settings, "PRINTABLES_DIR", Path(settings.BASE_DIR) / "var" / "printables"))
+
+
+def is_printable(obj):
+    spec = PRINTABLE.get(type(obj))
+    return spec is not None and obj.status == spec[0]
+
+
+def filename(obj):
+    return f"{PRINTABLE[type(obj)][1]}-{obj.pk}.pdf"
+
+
+def path_for(obj):
+    """Cache path for the object's current version.
+
+    Files live in one directory per object and are named by a hash of the
+    object, its ``updated_at`` and the layout version, so any edit to the
+    record (or the layout) maps to a new file and stale copies are never served.
+    """
+    key = f"{obj.campus}:{obj._meta.label_lower}:{obj.pk}:{obj.updated_at.isoformat()}:{LAYOUT_VERSION}"
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    # Primary keys repeat across campuses, so each campus has its own tree.
+    return storage_dir() / obj.campus / obj._meta.model_name / str(obj.pk) / f"{digest[:32]}.pdf"
+
+
+def ensure(obj):
+    """Return the path of the object's PDF, rendering it first if it is not cached."""
+    path = path_for(obj)
+    if path.exists():
+        return path
+
+    data = pdf.render(PRINTABLE[type(obj)][2](obj))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    # Older versions of this object's document are no longer reachable.
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def queryset(model):
+    return model.objects.select_related(*PRINTABLE[model][3])
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import re
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from . import shards
+from .models import ArchivedRecord, PaymentProof
+
+CHUNK_SIZE = 64 * 1024
+# Leading bytes -> content type. Anything else is rejected on the first chunk.
+SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"%PDF-", "application/pdf"),
+]
+IMAGE_TYPES = ("image/jpeg", "image/png")
+THUMBNAIL_SIZE = (320, 320)
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def max_bytes():
+    return getattr(settings, "PAYMENT_PROOF_MAX_BYTES", 5 * 1024 * 1024)
+
+
+def storage_dir():
+    return Path(getattr(settings, "PAYMENT_PROOF_DIR", Path(settings.BASE_DIR) / "var" / "proofs"))
+
+
+def blob_path(sha256):
+    # Content-addressed: identical uploads share one file on disk.
+    return storage_dir() / sha256[:2] / sha256
+
+
+def thumbnail_path(sha256):
+    return storage_dir() / "thumbs" / sha256[:2] / f"{sha256}.jpg"
+
+
+def sniff(head):
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+class StagedUpload:
+    """An uploaded file, hashed and waiting in the temp directory.
+
+    ``store()`` moves it into the proof store once a proof row refers to it;
+    ``discard()`` drops it if it was never stored.
+    """
+
+    def __init__(self, name, content_type, size, sha256, tmp):
+        self.name = name
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self._tmp = tmp
+
+    def store(self):
+        target = blob_path(self.sha256)
+        if target.exists():
+            os.unlink(self._tmp)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp, target)
+        self._tmp = None
+
+    def discard(self):
+        if self._tmp:
+            os.unlink(self._tmp)
+            self._tmp = None
+
+    def close(self):
+        pass
+
+
+class ProofUploadHandler(FileUploadHandler):
+    """Streams an upload straight to disk, hashing as it goes.
+
+    Nothing is held in memory beyond one chunk. The size limit is checked per
+    chunk, so an oversized upload stops being stored as soon as it crosses the
+    limit, and the file type is checked on the first chunk. ``error`` says why
+    a file was dropped. Files stay in the temp directory until the view stores
+    them; ``cleanup()`` removes whatever it did not.
+    """
+
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.staged = []
+        self._tmp = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > max_bytes() + CHUNK_SIZE:
+            self.error = "too_large"
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.error:
+            raise StopUpload()
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._type = None
+        storage_dir().joinpath("tmp").mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=storage_dir() / "tmp")
+        self._fh = os.fdopen(fd, "wb")
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._type is None:
+            self._type = sniff(raw_data)
+            if self._type is None:
+                self._abort("bad_type")
+        self._size += len(raw_data)
+        if self._size > max_bytes():
+            self._abort("too_large")
+        self._hash.update(raw_data)
+        self._fh.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._type is None:
+            # Empty file: no chunk ever arrived to sniff.
+            self.error = "bad_type"
+            self._discard()
+            return None
+        self._fh.close()
+        upload = StagedUpload(self.file_name, self._type, self._size, self._hash.hexdigest(), self._tmp)
+        self._tmp = None
+        self.staged.append(upload)
+        return upload
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def cleanup(self):
+        self._discard()
+        for upload in self.staged:
+            upload.discard()
+
+    def _abort(self, reason):
+        self.error = reason
+        self._discard()
+        raise StopUpload()
+
+    def _discard(self):
+        if self._tmp:
+            self._fh.close()
+            os.unlink(self._tmp)
+            self._tmp = None
+
+
+def in_use(sha256):
+    """Whether a proof, or the snapshot of an archived payment, refers to this content."""
+    return (
+        PaymentProof.objects.filter(sha256=sha256).exists()
+        or ArchivedRecord.objects.filter(model="FeePayment", data__proofs__icontains=sha256).exists()
+    )
+
+
+def discard_unused(sha256):
+    """Delete stored content (and its thumbnail) once nothing refers to it.
+
+    Every campus shares the one store, so every campus database is checked.
+    """
+    if not any(shards.gather(partial(in_use, sha256)).values()):
+        blob_path(sha256).unlink(missing_ok=True)
+        thumbnail_path(sha256).unlink(missing_ok=True)
+
+
+def make_thumbnail(sha256):
+    from PIL import Image
+
+    target = thumbnail_path(sha256)
+    if target.exists():
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(blob_path(sha256)) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            image.convert("RGB").save(fh, "JPEG", quality=80)
+    os.replace(tmp, target)
+    return target
+
+
+def _read(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            data = fh.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def ranged_response(request, path, content_type, filename=None):
+    """Stream a file in chunks, honouring a single ``Range: bytes=`` header."""
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    status = 200
+    match = _RANGE.match(request.headers.get("Range", "").strip())
+    if match and size:
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+        if not (first or last) or start > end:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        status = 206
+
+    response = StreamingHttpResponse(_read(path, start, end - start + 1), status=status, content_type=content_type)
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if filename:
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
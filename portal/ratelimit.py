@@ -0,0 +1,227 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+
+class LocalStore:
+    """In-process key store with per-entry expiry and a size cap (oldest entries go first)."""
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return entry[1] if entry else None
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            now = time.monotonic()
+            if self._live(key, now):
+                return False
+            self._put(key, value, now + ttl)
+            return True
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data.pop(key, None)
+            self._put(key, value, time.monotonic() + ttl)
+
+    def _put(self, key, value, expires):
+        self._data[key] = (expires, value)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def incr(self, key, delta, ttl):
+        """Add ``delta`` to the counter at ``key`` (created at 0 for ``ttl`` seconds); returns the new value."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._live(key, now)
+            expires, value = entry if entry else (now + ttl, 0)
+            self._put(key, value + delta, expires)
+            return value + delta
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Counters used while the cache backend is unreachable, per process.
+_local_counts = LocalStore()
+
+
+def _incr(key, delta, ttl):
+    """Atomically add ``delta`` to the counter at ``key`` (created at 0); returns the new value."""
+    try:
+        cache.add(key, 0, ttl)
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr(); a fresh window starts here.
+        cache.add(key, 0, ttl)
+        return cache.incr(key, delta)
+    except Exception:
+        # Cache backend unreachable: fall back to this process's own counters.
+        return _local_counts.incr(key, delta, ttl)
+
+
+def _count(key):
+    try:
+        return cache.get(key, 0)
+    except Exception:
+        return _local_counts.get(key) or 0
+
+
+def _window(key, period, now):
+    index = math.floor(now / period)
+    return f"{key}:{index}", f"{key}:{index - 1}", now / period - index
+
+
+def take(key, limit, period):
+    """Take one of ``limit`` requests per ``period`` seconds for ``key``.
+
+    A sliding window: the current fixed window's count plus the previous
+    window's count weighted by how much of it still overlaps. Counting is a
+    single cache increment, so worker processes sharing the cache can't
+    both take the last slot. Returns 0 when a slot was taken, otherwise the
+    seconds until one frees up.
+    """
+    current, previous, elapsed = _window(key, period, time.time())
+    before = _count(previous)
+    count = _incr(current, 1, int(period * 2) + 1)
+    if before * (1 - elapsed) + count <= limit:
+        return 0
+    _incr(current, -1, int(period * 2) + 1)
+    # The previous window's weight drops until the estimate fits again, or
+    # the next window starts.
+    spare = limit - (count - 1) - 1
+    if before and spare >= 0:
+        return max((1 - spare / before - elapsed) * period, 0.001)
+    return (1 - elapsed) * period
+
+
+def refund(key, period):
+    """Give back a slot taken by ``take`` when the request is turned away after all."""
+    current, _, _ = _window(key, period, time.time())
+    _incr(current, -1, int(period * 2) + 1)
+
+
+class AdmissionQueue:
+    """Caps concurrent writers per process and sheds load once the wait line is full.
+
+    Up to ``max_active`` requests run at once; up to ``max_waiting`` more may
+    wait ``timeout`` seconds for a slot. Anything beyond that is rejected right
+    away, so latency for admitted requests stays bounded under overload.
+    """
+
+    def __init__(self, max_active, max_waiting, timeout):
+        self.slots = threading.BoundedSemaphore(max_active)
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.waiting = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self.waiting >= self.max_waiting:
+                self.shed += 1
+                return False
+            self.waiting += 1
+        try:
+            admitted = self.slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not admitted:
+            with self._lock:
+                self.shed += 1
+        return admitted
+
+    def release(self):
+        self.slots.release()
+
+
+admission = AdmissionQueue(
+    getattr(settings, "ADMISSION_MAX_ACTIVE", 4),
+    getattr(settings, "ADMISSION_MAX_WAITING", 16),
+    getattr(settings, "ADMISSION_WAIT_SECONDS", 2.0),
+)
+
+
+def _client_ip(request):
+    # X-Forwarded-For is set by the client unless a proxy we run overwrites it;
+    # trust only the hops added by the RATE_LIMIT_PROXY_COUNT proxies in front.
+    proxies = getattr(settings, "RATE_LIMIT_PROXY_COUNT", 0)
+    if proxies:
+        hops = [hop.strip() for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _client_key(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{_client_ip(request)}"
+
+
+def too_busy_response(request, retry_after):
+    """The 429 "busy" page, asking the client to retry in ``retry_after`` seconds (rounded up)."""
+    retry_after = max(1, int(retry_after + 0.999))
+    response = render(request, "portal/busy.html", {"retry_after": retry_after}, status=429)
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def throttled(scope):
+    """Rate-limit and admission-control the POST side of a submission view."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "POST":
+                return view(request, *args, **kwargs)
+
+            limits = getattr(settings, "RATE_LIMITS", {}).get(scope, {})
+            user_key = f"rl:{scope}:{_client_key(request)}"
+            if "user" in limits:
+                wait = take(user_key, *limits["user"])
+                if wait:
+                    return too_busy_response(request, wait)
+            if "global" in limits:
+                wait = take(f"rl:{scope}:global", *limits["global"])
+                if wait:
+                    # Turned away for everyone's sake; don't charge this client for it.
+                    if "user" in limits:
+                        refund(user_key, limits["user"][1])
+                    return too_busy_response(request, wait)
+
+            if not admission.acquire():
+                return too_busy_response(request, admission.timeout)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                admission.release()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,229 @@
+import csv
+from array import array
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, CharField, Count, F
+from django.db.models.functions import Cast, Round, Substr
+from django.utils import timezone
+
+from .models import DocumentRequest, DocumentType, FeePayment, StudentProfile
+
+CHUNK_SIZE = 5000
+BILLED_REQUEST_STATUSES = ["APPROVED", "RELEASED"]
+TABLES = ("fees", "documents", "courses", "days")
+
+
+def _money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class _LocalDays:
+    """Maps UTC "YYYY-MM-DD HH:MM" strings to local day ordinals, memoized per hour.
+
+    An hour whose first and last minute fall on the same local day (every hour,
+    for whole-hour UTC offsets) is resolved once; the rest are resolved per minute.
+    """
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+        self.hours = {}
+        self.minutes = {}
+
+    def _day(self, text):
+        stamp = datetime.fromisoformat(text).replace(tzinfo=dt_timezone.utc)
+        return stamp.astimezone(self.tz).toordinal()
+
+    def __call__(self, minute):
+        hour = minute[:13]
+        day = self.hours.get(hour, 0)
+        if day == 0:
+            first, last = self._day(f"{minute[:10]} {minute[11:13]}:00"), self._day(f"{minute[:10]} {minute[11:13]}:59")
+            day = self.hours[hour] = first if first == last else None
+        if day is None:
+            day = self.minutes.get(minute)
+            if day is None:
+                day = self.minutes[minute] = self._day(f"{minute[:10]} {minute[11:16]}")
+        return day
+
+
+def _bounds(start, end):
+    # Whole local days, as aware datetimes so the paid_at/requested_at indexes are usable.
+    tz = timezone.get_current_timezone()
+    lower = datetime.combine(start, time.min, tzinfo=tz) if start else None
+    upper = datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz) if end else None
+    return lower, upper
+
+
+class PaymentColumns:
+    """Payments loaded as parallel typed arrays, one entry per row.
+
+    Text columns are dictionary-encoded: ``fees[i]`` indexes ``fee_names`` and
+    ``groups[i]`` indexes ``group_keys`` (course, year level). Amounts are
+    integer centavos and days are proleptic ordinals, so a million rows take
+    about 20 MB and every report below is a single pass over the arrays.
+    """
+
+    def __init__(self):
+        self.fees = array("I")
+        self.groups = array("I")
+        self.days = array("l")
+        self.cents = array("q")
+        self.fee_names = []
+        self.group_keys = []
+
+    def __len__(self):
+        return len(self.cents)
+
+    @classmethod
+    def load(cls, status="VERIFIED", start=None, end=None):
+        cols = cls()
+
+        # Students are few next to payments: map each one to its (course, year) code up front
+        # instead of joining StudentProfile into every payment row.
+        group_codes = {}
+        student_group = {}
+        for pk, course, year in StudentProfile.objects.values_list("pk", "course", "year_level").iterator(chunk_size=CHUNK_SIZE):
+            key = (course, year)
+            if key not in group_codes:
+                group_codes[key] = len(cols.group_keys)
+                cols.group_keys.append(key)
+            student_group[pk] = group_codes[key]
+
+        qs = FeePayment.objects.all()
+        if status:
+            qs = qs.filter(status=status)
+        lower, upper = _bounds(start, end)
+        if lower:
+            qs = qs.filter(paid_at__gte=lower)
+        if upper:
+            qs = qs.filter(paid_at__lt=upper)
+        rows = (
+            qs.order_by()
+            .annotate(
+                centavos=Cast(Round(F("amount") * 100), BigIntegerField()),
+                # paid_at as text, cut to the minute: parsing a datetime per row costs more than the
+                # rest of the load, while a year of payments only spans ~9k distinct hours.
+                minute=Substr(Cast("paid_at", CharField()), 1, 16),
+            )
+            .values_list("fee_name", "student_id", "centavos", "minute")
+        )
+
+        fee_codes = {}
+        day_of = _LocalDays()
+        fees, groups, days, cents = [], [], [], []
+        for fee_name, student_id, centavos, minute in rows.iterator(chunk_size=CHUNK_SIZE):
+            code = fee_codes.get(fee_name)
+            if code is None:
+                code = fee_codes[fee_name] = len(cols.fee_names)
+                cols.fee_names.append(fee_name)
+            fees.append(code)
+            groups.append(student_group[student_id])
+            days.append(day_of(minute))
+            cents.append(centavos)
+            if len(cents) >= CHUNK_SIZE:
+                cols._extend(fees, groups, days, cents)
+                fees, groups, days, cents = [], [], [], []
+        cols._extend(fees, groups, days, cents)
+        return cols
+
+    def _extend(self, fees, groups, days, cents):
+        self.fees.extend(fees)
+        self.groups.extend(groups)
+        self.days.extend(days)
+        self.cents.extend(cents)
+
+    def sum_by(self, codes):
+        """{code: (count, cents)} for one of the code columns."""
+        totals = Counter()
+        for code, cents in zip(codes, self.cents):
+            totals[code] += cents
+        counts = Counter(codes)
+        return {code: (counts[code], totals[code]) for code in counts}
+
+
+def fee_totals(cols):
+    rows = [
+        {"fee_name": cols.fee_names[code], "count": count, "total": _money(cents)}
+        for code, (count, cents) in cols.sum_by(cols.fees).items()
+    ]
+    return sorted(rows, key=lambda r: (-r["total"], r["fee_name"]))
+
+
+def course_pivot(cols):
+    """Course rows by year-level columns, plus the year levels present."""
+    sums = cols.sum_by(cols.groups)
+    years = sorted({cols.group_keys[code][1] for code in sums})
+    by_course = {}
+    for code, (count, cents) in sums.items():
+        course, year = cols.group_keys[code]
+        row = by_course.setdefault(course, {"course": course, "cells": dict.fromkeys(years, 0), "count": 0, "total": 0})
+        row["cells"][year] += cents
+        row["count"] += count
+        row["total"] += cents
+    rows = []
+    for course in sorted(by_course):
+        row = by_course[course]
+        row["cells"] = [_money(row["cells"][year]) for year in years]
+        row["total"] = _money(row["total"])
+        rows.append(row)
+    return years, rows
+
+
+def daily_totals(cols):
+    return [
+        {"day": date.fromordinal(day), "count": count, "total": _money(cents)}
+        for day, (count, cents) in sorted(cols.sum_by(cols.days).items())
+    ]
+
+
+def document_costs(start=None, end=None):
+    """Billable document fees: each type's current fee times its approved or released requests."""
+    qs = DocumentRequest.objects.filter(status__in=BILLED_REQUEST_STATUSES)
+    lower, upper = _bounds(start, end)
+    if lower:
+        qs = qs.filter(requested_at__gte=lower)
+    if upper:
+        qs = qs.filter(requested_at__lt=upper)
+    counts = dict(qs.order_by().values_list("doc_type").annotate(n=Count("id")))
+    rows = [
+        {"doc_type": name, "fee": fee, "count": counts[pk], "total": fee * counts[pk]}
+        for pk, name, fee in DocumentType.objects.filter(pk__in=counts).values_list("pk", "name", "fee")
+    ]
+    return sorted(rows, key=lambda r: (-r["total"], r["doc_type"]))
+
+
+def build(status="VERIFIED", start=None, end=None):
+    cols = PaymentColumns.load(status, start, end)
+    years, courses = course_pivot(cols)
+    documents = document_costs(start, end)
+    return {
+        "payments": len(cols),
+        "payment_total": _money(sum(cols.cents)),
+        "fees": fee_totals(cols),
+        "documents": documents,
+        "document_total": sum((r["total"] for r in documents), Decimal("0.00")),
+        "years": years,
+        "courses": courses,
+        "days": daily_totals(cols),
+    }
+
+
+def write_csv(out, report, table):
+    writer = csv.writer(out)
+    if table == "fees":
+        writer.writerow(["fee_name", "payments", "total"])
+        writer.writerows([r["fee_name"], r["count"], r["total"]] for r in report["fees"])
+    elif table == "documents":
+        writer.writerow(["document_type", "fee", "requests", "total"])
+        writer.writerows([r["doc_type"], r["fee"], r["count"], r["total"]] for r in report["documents"])
+    elif table == "courses":
+        writer.writerow(["course"] + [f"year_{y}" for y in report["years"]] + ["payments", "total"])
+        writer.writerows([r["course"], *r["cells"], r["count"], r["total"]] for r in report["courses"])
+    elif table == "days":
+        writer.writerow(["day", "payments", "total"])
+        writer.writerows([r["day"].isoformat(), r["count"], r["total"]] for r in report["days"])
+    else:
+        raise ValueError(f"Unknown report table: {table}")
@@ -0,0 +1,283 @@
+"""Campus sharding: one database per campus.
+
+Each campus in CAMPUSES keeps its students and everything they file (requests,
+appointments, payments, inquiries and the rows hanging off them) in its own
+database. The ``default`` database holds what all campuses share: users and
+sessions, document types and the job queue. Users and document types are
+copied into every campus database as they are saved, so campus rows keep real
+foreign keys and joins to them.
+
+Queries on campus tables go to the database of the row they start from and
+otherwise to the current campus: set per request by CampusMiddleware, per job
+by the job worker, and with ``use()`` anywhere else. Staff lists run the same
+query in every campus at once with ``gather()`` and combine the sorted results
+with ``merge()``.
+"""
+import contextvars
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import copy
+from functools import partial, wraps
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404
+
+from . import metrics
+
+SESSION_KEY = "campus"
+# portal models kept once, in the default database; every other portal model is per campus.
+SHARED_MODELS = {"portal.documenttype", "portal.job"}
+
+_campus = contextvars.ContextVar("campus", default=None)
+_pinned = contextvars.ContextVar("pinned_database", default=None)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def campuses():
+    return getattr(settings, "CAMPUSES", None) or {"main": {"name": "Main Campus", "database": DEFAULT_DB_ALIAS}}
+
+
+def default_campus():
+    return getattr(settings, "DEFAULT_CAMPUS", None) or next(iter(campuses()))
+
+
+def database(campus):
+    return campuses()[campus].get("database", DEFAULT_DB_ALIAS)
+
+
+def name(campus):
+    return campuses().get(campus, {}).get("name", campus)
+
+
+def choices():
+    return [(campus, spec.get("name", campus)) for campus, spec in campuses().items()]
+
+
+def campus_databases():
+    """Campus databases other than ``default``, in CAMPUSES order."""
+    return [db for db in dict.fromkeys(database(campus) for campus in campuses()) if db != DEFAULT_DB_ALIAS]
+
+
+def selected(campus=None):
+    """``[campus]``, or every campus when none is given (for ``--campus`` options)."""
+    return [campus] if campus else list(campuses())
+
+
+def current():
+    return _campus.get() or default_campus()
+
+
+def alias():
+    return database(current())
+
+
+@contextmanager
+def use(campus):
+    """Make ``campus`` the current campus (``None``: the default one) inside the block."""
+    token = _campus.set(campus)
+    try:
+        yield
+    finally:
+        _campus.reset(token)
+
+
+@contextmanager
+def pinned(db):
+    """Send every query, shared tables included, to ``db``; used while migrating it."""
+    token = _pinned.set(db)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def is_sharded(model):
+    return model._meta.app_label == "portal" and model._meta.label_lower not in SHARED_MODELS
+
+
+class CampusRouter:
+    def db_for_read(self, model, **hints):
+        if _pinned.get():
+            return _pinned.get()
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and is_sharded(instance):
+            if getattr(instance, "campus", ""):
+                return database(instance.campus)
+            if instance._state.db:
+                return instance._state.db
+        return alias()
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shared rows exist in every campus database.
+        if not (is_sharded(obj1) and is_sharded(obj2)):
+            return True
+        return None
+
+
+class CampusMiddleware:
+    """Sets the current campus for the request.
+
+    Students always work in their own campus, looked up once per session.
+    Staff work in the campus they last opened with ``?campus=`` (their lists
+    and dashboard show every campus regardless). That remembered campus is
+    only a working campus for the work queue and fee report: a staff page for
+    one record must name its campus in the URL (see ``campus_in_url``).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with use(self.campus_for(request)):
+            return self.get_response(request)
+
+    def campus_for(self, request):
+        known = campuses()
+        user = request.user
+        if user.is_authenticated and not user.is_staff:
+            campus = request.session.get(SESSION_KEY)
+            if campus not in known:
+                campus = request.session[SESSION_KEY] = locate(user) or default_campus()
+            return campus
+        campus = request.GET.get("campus")
+        if user.is_authenticated and campus in known:
+            request.session[SESSION_KEY] = campus
+            return campus
+        campus = request.session.get(SESSION_KEY)
+        return campus if campus in known else default_campus()
+
+
+def campus_in_url(view):
+    """View decorator: staff must name the record's campus with ``?campus=``.
+
+    Primary keys repeat across campus databases, so a pk alone does not say
+    which record is meant, and the campus a staff member last opened is no
+    guide to it. Students, whose records are all in their own campus, and
+    single-campus setups skip the check.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.user.is_staff and len(campuses()) > 1 and request.GET.get("campus") not in campuses():
+            raise Http404("No campus given for this record.")
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def context(request):
+    """Template context: campus choices (empty with a single campus) and the current one."""
+    return {"campus_choices": choices() if len(campuses()) > 1 else [], "current_campus": current()}
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(getattr(settings, "CAMPUS_FANOUT_WORKERS", 8), thread_name_prefix="campus")
+    return _executor
+
+
+def _run(fn, campus):
+    # Pool threads are few and live as long as the process, so they keep their
+    # connections open between requests instead of reconnecting every time.
+    # Only a connection left broken by an error is dropped.
+    spent = {"db": 0.0, "queries": 0}
+    with use(campus), metrics.track_queries(spent):
+        try:
+            return fn(), spent
+        finally:
+            for connection in connections.all(initialized_only=True):
+                if connection.errors_occurred and not connection.is_usable():
+                    connection.close()
+
+
+def gather(fn):
+    """``{campus: fn()}``, with ``fn`` run in every campus at the same time.
+
+    ``fn`` must run its queries itself (return a list, not a queryset), since
+    a queryset evaluated later runs in the caller's campus. It must not call
+    ``gather()`` again. Query time in the pool threads counts toward the
+    calling request's metrics.
+    """
+    keys = list(campuses())
+    if len(keys) == 1:
+        with use(keys[0]):
+            return {keys[0]: fn()}
+    runs = list(_pool().map(partial(_run, fn), keys))
+    timing = metrics.request_timing()
+    if timing is not None:
+        for _, spent in runs:
+            timing["db"] += spent["db"]
+            timing["queries"] += spent["queries"]
+    return {campus: result for campus, (result, _) in zip(keys, runs)}
+
+
+def merge(runs, key, reverse=False, limit=None):
+    """Combine per-campus results, each already sorted by ``key``, into one sorted list."""
+    return list(islice(heapq.merge(*runs, key=key, reverse=reverse), limit))
+
+
+def locate(user):
+    """The campus holding ``user``'s student profile, or None."""
+    from .models import StudentProfile
+
+    found = gather(lambda: StudentProfile.objects.filter(user_id=user.pk).exists())
+    return next((campus for campus, exists in found.items() if exists), None)
+
+
+def copy_shared(model, objs, databases=None):
+    """Insert or update rows of a shared model in the campus databases."""
+    fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    for db in campus_databases() if databases is None else databases:
+        model._base_manager.using(db).bulk_create(
+            [copy(obj) for obj in objs], update_conflicts=True, unique_fields=[model._meta.pk.name], update_fields=fields
+        )
+
+
+def mirrored_models():
+    """Shared models that campus rows point at, kept copied into every campus database."""
+    return [apps.get_model(settings.AUTH_USER_MODEL), apps.get_model("portal", "DocumentType")]
+
+
+def sync_shared(db, batch_size=1000):
+    """Copy every mirrored row into ``db``; returns the row count."""
+    count = 0
+    for model in mirrored_models():
+        batch = []
+        for obj in model._base_manager.using(DEFAULT_DB_ALIAS).order_by("pk").iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                copy_shared(model, batch, [db])
+                count += len(batch)
+                batch = []
+        copy_shared(model, batch, [db])
+        count += len(batch)
+    return count
+
+
+def mirror_saved(sender, instance, raw=False, using=None, **kwargs):
+    if using == DEFAULT_DB_ALIAS and not raw:
+        copy_shared(sender, [instance])
+
+
+def mirror_deleted(sender, instance, using=None, **kwargs):
+    # Runs before the delete in default, so a campus row that protects the
+    # shared one stops the whole delete.
+    if using != DEFAULT_DB_ALIAS:
+        return
+    for campus in campuses():
+        db = database(campus)
+        if db != DEFAULT_DB_ALIAS:
+            with use(campus):
+                sender._base_manager.using(db).filter(pk=instance.pk).delete()
@@ -0,0 +1,119 @@
+from functools import partial, update_wrapper
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.urls import reverse
+
+from . import directory, jobs, proofs, shards, suggestions, summaries
+from .events import broker
+from .models import Appointment, DocumentRequest, DocumentType, FeePayment, Inquiry, PaymentProof, StudentProfile
+
+PROCESS_URLS = {
+    DocumentRequest: "request_process",
+    Appointment: "appointment_process",
+    FeePayment: "payment_process",
+    Inquiry: "inquiry_process",
+}
+
+
+def _event(instance, action):
+    event = {
+        "model": instance.__class__.__name__,
+        "id": instance.pk,
+        "action": action,
+        "status": instance.status,
+        "campus": instance.campus,
+    }
+    if action != "deleted":
+        event["url"] = f"{reverse(PROCESS_URLS[instance.__class__], args=[instance.pk])}?campus={instance.campus}"
+    return event
+
+
+def publish_saved(sender, instance, created, using=None, **kwargs):
+    event = _event(instance, "created" if created else "updated")
+    transaction.on_commit(partial(broker.publish, event), using=using)
+
+
+def publish_deleted(sender, instance, using=None, **kwargs):
+    event = _event(instance, "deleted")
+    transaction.on_commit(partial(broker.publish, event), using=using)
+
+
+def _named(func, *args):
+    """``partial(func, *args)`` carrying ``func``'s name.
+
+    Django logs a failed robust on_commit callback by its ``__qualname__``,
+    which a bare partial lacks; without one the save that queued it fails.
+    """
+    return update_wrapper(partial(func, *args), func)
+
+
+def refresh_summary(sender, instance, using=None, **kwargs):
+    kind = summaries.KIND_BY_MODEL[sender]
+    transaction.on_commit(_named(summaries.refresh, instance.student_id, [kind]), using=using, robust=True)
+
+
+def discard_proof_file(sender, instance, using=None, **kwargs):
+    transaction.on_commit(_named(proofs.discard_unused, instance.sha256), using=using, robust=True)
+
+
+def note_processing_days(sender, instance, raw=False, using=None, **kwargs):
+    instance._reschedule = False
+    if raw or using != DEFAULT_DB_ALIAS or instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list("processing_days", flat=True).first()
+    instance._reschedule = old is not None and old != instance.processing_days
+
+
+def reschedule_requests(sender, instance, **kwargs):
+    # Open requests keep the due date stored when they were filed; move them
+    # to the new processing time in the background, campus by campus.
+    if getattr(instance, "_reschedule", False):
+        instance._reschedule = False
+        for campus in shards.campuses():
+            with shards.use(campus):
+                jobs.enqueue("portal.reschedule_doc_type", doc_type=instance.pk)
+
+
+def reindex_student(sender, instance, **kwargs):
+    directory.reindex(instance)
+
+
+def reindex_user(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; skip anything that can't change the index.
+    if update_fields is not None and not {"username", "first_name", "last_name"} & set(update_fields):
+        return
+    # The user's profile may be in any campus.
+    for campus in shards.campuses():
+        with shards.use(campus):
+            profile = StudentProfile.objects.filter(user=instance).first()
+            if profile:
+                profile.user = instance
+                directory.reindex(profile)
+                return
+
+
+def reindex_inquiry(sender, instance, **kwargs):
+    suggestions.reindex(instance)
+
+
+post_save.connect(reindex_student, sender=StudentProfile, dispatch_uid="directory-student-save")
+post_save.connect(reindex_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="directory-user-save")
+post_save.connect(reindex_inquiry, sender=Inquiry, dispatch_uid="suggestions-inquiry-save")
+post_delete.connect(discard_proof_file, sender=PaymentProof, dispatch_uid="proof-file-delete")
+pre_save.connect(note_processing_days, sender=DocumentType, dispatch_uid="sla-doc-type-pre-save")
+
+# Users and document types are copied into every campus database.
+for model in (settings.AUTH_USER_MODEL, "portal.DocumentType"):
+    post_save.connect(shards.mirror_saved, sender=model, dispatch_uid=f"campus-mirror-{model}-save")
+    pre_delete.connect(shards.mirror_deleted, sender=model, dispatch_uid=f"campus-mirror-{model}-delete")
+
+# After the mirror, so campus databases already hold the new processing days.
+post_save.connect(reschedule_requests, sender=DocumentType, dispatch_uid="sla-doc-type-save")
+
+for model in PROCESS_URLS:
+    post_save.connect(publish_saved, sender=model, dispatch_uid=f"live-{model.__name__}-save")
+    post_delete.connect(publish_deleted, sender=model, dispatch_uid=f"live-{model.__name__}-delete")
+    post_save.connect(refresh_summary, sender=model, dispatch_uid=f"summary-{model.__name__}-save")
+    post_delete.connect(refresh_summary, sender=model, dispatch_uid=f"summary-{model.__name__}-delete")
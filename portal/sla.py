@@ -0,0 +1,102 @@
+"""Due dates for document requests.
+
+A request is due at the office closing time on the ``processing_days``-th
+business day after it was filed. Weekends and ``SLA_HOLIDAYS`` are not
+business days; a request filed on one starts counting from the next business
+day. The due time is stored on the row (``DocumentRequest.due_at``) when the
+request is filed, so the due queue is a range scan over an index instead of
+a calendar walk per pending row.
+"""
+import datetime
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.utils import timezone
+
+# Requests that still count against their due date.
+OPEN_STATUSES = ("PENDING", "APPROVED")
+
+
+def _holidays():
+    return frozenset(
+        day if isinstance(day, datetime.date) else datetime.date.fromisoformat(day)
+        for day in getattr(settings, "SLA_HOLIDAYS", ())
+    )
+
+
+def _closing_time():
+    value = getattr(settings, "SLA_CLOSING_TIME", "17:00")
+    return value if isinstance(value, datetime.time) else datetime.time.fromisoformat(value)
+
+
+def is_business_day(day, holidays=None):
+    if holidays is None:
+        holidays = _holidays()
+    return day.weekday() not in getattr(settings, "SLA_WEEKEND", (5, 6)) and day not in holidays
+
+
+def add_business_days(day, days, holidays=None):
+    """The ``days``-th business day after ``day`` (``day`` itself, rolled forward, for 0)."""
+    if holidays is None:
+        holidays = _holidays()
+    while not is_business_day(day, holidays):
+        day += datetime.timedelta(days=1)
+    while days > 0:
+        day += datetime.timedelta(days=1)
+        if is_business_day(day, holidays):
+            days -= 1
+    return day
+
+
+def closing(day):
+    """Office closing time on ``day``, as an aware datetime in the current time zone."""
+    return timezone.make_aware(datetime.datetime.combine(day, _closing_time()))
+
+
+def end_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
+
+def due_at(requested_at, processing_days, holidays=None):
+    day = timezone.localtime(requested_at).date()
+    return closing(add_business_days(day, processing_days, holidays))
+
+
+def due_queue(queryset, before, limit):
+    """Open requests in ``queryset`` due before ``before``, earliest first.
+
+    Each open status is read as its own (status, due_at) index range, already
+    in due order, and the runs are merged; no row past ``limit`` is read and
+    nothing is sorted.
+    """
+    runs = [queryset.filter(status=status, due_at__lt=before).order_by("due_at")[:limit] for status in OPEN_STATUSES]
+    return list(islice(heapq.merge(*runs, key=attrgetter("due_at")), limit))
+
+
+def reschedule(queryset, batch_size=500):
+    """Recompute ``due_at`` for every request in ``queryset``; returns the row count.
+
+    Requests filed on the same day for the same processing time share a due
+    time, so rows are grouped by it and written with one UPDATE per group.
+    Works on historical models too, so migrations can use it.
+    """
+    holidays = _holidays()
+    memo = {}
+    groups = {}
+    count = 0
+    rows = queryset.order_by().values_list("pk", "requested_at", "doc_type__processing_days")
+    for pk, requested_at, days in rows.iterator(chunk_size=2000):
+        key = (timezone.localtime(requested_at).date(), days)
+        if key not in memo:
+            memo[key] = closing(add_business_days(key[0], days, holidays))
+        pks = groups.setdefault(memo[key], [])
+        pks.append(pk)
+        if len(pks) >= batch_size:
+            count += queryset.model.objects.filter(pk__in=pks).update(due_at=memo[key])
+            pks.clear()
+    for due, pks in groups.items():
+        if pks:
+            count += queryset.model.objects.filter(pk__in=pks).update(due_at=due)
+    return count
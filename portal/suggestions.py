@@ -0,0 +1,156 @@
+"""Inquiry similarity index for reply suggestions and duplicate clusters.
+
+Every inquiry's subject and message are reduced to terms, and each term is
+stored in InquiryTerm with its TF-IDF weight, normalized so an inquiry's
+weights form a unit vector. The dot product of two inquiries' weights is
+then their cosine similarity. Rows are written when an inquiry is saved.
+IDF is taken as of that moment, so weights drift slightly as the corpus
+grows; ``manage.py rebuild_inquiry_index`` re-weights everything.
+
+A lookup never scans a whole posting list. For each of the query's
+strongest terms it reads the CHAMPIONS most recent postings on the same
+side (answered or not), newest first, from the (term, inquiry, answered)
+index. Recent replies are the ones most likely to reflect current practice.
+Only those candidates are then scored exactly.
+"""
+import math
+from collections import Counter
+
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .directory import tokenize
+from .models import Inquiry, InquiryTerm
+
+MAX_TERM_LENGTH = 40
+# Subject words say more about the topic than message words.
+SUBJECT_WEIGHT = 2
+# Only the strongest terms of the query inquiry are looked up; weak terms are
+# the common ones, with long posting lists and little effect on the ranking.
+QUERY_TERMS = 8
+# Postings read per query term to find candidates.
+CHAMPIONS = 100
+ANSWERED = ("ANSWERED", "CLOSED")
+DUPLICATE_SCORE = 0.6
+
+STOPWORDS = frozenset(
+    """
+    a about am an and any are as at be been but by can could did do does for from get got had has have hello hi how
+    i if in into is it its just me my no not now of on or our please so thank thanks that the their them then there
+    these this to too was we were what when where which who why will with would yes you your
+    ako ang ba din lang mag na naman ng ni nila niyo po sa si sana yung
+    """.split()
+)
+
+
+def _stem(token):
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def term_counts(subject, message):
+    counts = Counter()
+    for text, weight in ((subject, SUBJECT_WEIGHT), (message, 1)):
+        for token in tokenize(text):
+            # Bare numbers are reference and ID numbers: unique, and no help in matching topics.
+            if len(token) > 1 and not token.isdigit() and token not in STOPWORDS:
+                counts[_stem(token)[:MAX_TERM_LENGTH]] += weight
+    return counts
+
+
+def weigh(counts, document_frequency, total):
+    """Unit-length TF-IDF vector (term -> weight) from raw term counts.
+
+    ``document_frequency`` counts the inquiries containing each term, this one
+    included, out of ``total``.
+    """
+    weights = {
+        term: (1 + math.log(count)) * (math.log((total + 1) / (document_frequency.get(term, 1) + 1)) + 1)
+        for term, count in counts.items()
+    }
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+
+def is_answered(status, reply):
+    return status in ANSWERED and bool(reply)
+
+
+def reindex(inquiry):
+    counts = term_counts(inquiry.subject, inquiry.message)
+    answered = is_answered(inquiry.status, inquiry.reply)
+    rows = InquiryTerm.objects.filter(inquiry=inquiry)
+    if set(rows.values_list("term", flat=True)) == set(counts):
+        # Text unchanged (a reply or status change): keep the weights.
+        rows.exclude(answered=answered).update(answered=answered)
+        return
+    rows.delete()
+    if not counts:
+        return
+    others = InquiryTerm.objects.filter(term__in=counts).values("term").annotate(n=Count("id")).values_list("term", "n")
+    document_frequency = {term: n + 1 for term, n in others}
+    weights = weigh(counts, document_frequency, Inquiry.objects.count())
+    InquiryTerm.objects.bulk_create(
+        InquiryTerm(inquiry=inquiry, term=term, weight=w, answered=answered) for term, w in weights.items()
+    )
+
+
+def rebuild(inquiry_model=Inquiry, term_model=InquiryTerm, batch_size=5000):
+    """Re-weight the whole index from scratch; returns the number of inquiries indexed.
+
+    Takes the models as arguments so migrations can pass historical ones.
+    """
+    rows = inquiry_model.objects.order_by().values_list("pk", "subject", "message", "status", "reply")
+    document_frequency = Counter()
+    total = 0
+    for _, subject, message, _, _ in rows.iterator(chunk_size=2000):
+        document_frequency.update(term_counts(subject, message).keys())
+        total += 1
+
+    term_model.objects.all().delete()
+    batch = []
+    for pk, subject, message, status, reply in rows.iterator(chunk_size=2000):
+        answered = is_answered(status, reply)
+        for term, w in weigh(term_counts(subject, message), document_frequency, total).items():
+            batch.append(term_model(inquiry_id=pk, term=term, weight=w, answered=answered))
+        if len(batch) >= batch_size:
+            term_model.objects.bulk_create(batch)
+            batch = []
+    term_model.objects.bulk_create(batch)
+    return total
+
+
+def similar(inquiry, answered, statuses, limit, min_score=0.0):
+    """``[(inquiry, score)]`` in ``statuses`` most similar to ``inquiry``, best first."""
+    vector = dict(
+        InquiryTerm.objects.filter(inquiry=inquiry).order_by("-weight").values_list("term", "weight")[:QUERY_TERMS]
+    )
+    candidates = set()
+    for term in vector:
+        postings = InquiryTerm.objects.filter(term=term, answered=answered).order_by("-inquiry_id")
+        candidates.update(postings.values_list("inquiry", flat=True)[:CHAMPIONS])
+    candidates.discard(inquiry.pk)
+    if not candidates:
+        return []
+
+    score = Sum(F("weight") * Case(*(When(term=t, then=Value(w)) for t, w in vector.items()), output_field=FloatField()))
+    ranked = list(
+        InquiryTerm.objects.filter(inquiry__in=candidates, term__in=vector, inquiry__status__in=statuses)
+        .values("inquiry")
+        .annotate(score=score)
+        .filter(score__gte=min_score)
+        .order_by("-score", "-inquiry")
+        .values_list("inquiry", "score")[:limit]
+    )
+    found = Inquiry.objects.select_related("student").in_bulk([pk for pk, _ in ranked])
+    return [(found[pk], score) for pk, score in ranked if pk in found]
+
+
+def suggested_replies(inquiry, limit=5):
+    """Answered inquiries most like this one; their ``reply`` is the suggestion."""
+    return similar(inquiry, True, ANSWERED, limit)
+
+
+def open_duplicates(inquiry, limit=50):
+    """Open inquiries close enough to this one to take the same reply."""
+    return similar(inquiry, False, ("OPEN",), limit, DUPLICATE_SCORE)
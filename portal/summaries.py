@@ -0,0 +1,156 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from . import shards
+from .models import Appointment, DocumentRequest, FeePayment, Inquiry, StudentProfile, StudentSummary
+
+RECENT_LIMIT = 6
+
+# Keys in each kind's recent rows that hold datetimes (stored as ISO strings).
+DATE_KEYS = {
+    "requests": ("requested_at",),
+    "appointments": ("schedule",),
+    "payments": ("paid_at",),
+    "inquiries": ("created_at",),
+}
+
+# Each kind's timestamp counted as activity; last_activity is the newest of them.
+ACTIVITY = {
+    "requests": (DocumentRequest, "requested_at"),
+    "appointments": (Appointment, "created_at"),
+    "payments": (FeePayment, "created_at"),
+    "inquiries": (Inquiry, "created_at"),
+}
+
+KIND_BY_MODEL = {
+    DocumentRequest: "requests",
+    Appointment: "appointments",
+    FeePayment: "payments",
+    Inquiry: "inquiries",
+}
+
+
+def _requests(student_id):
+    qs = DocumentRequest.objects.filter(student_id=student_id)
+    stats = qs.aggregate(open=Count("id", filter=Q(status__in=["PENDING", "APPROVED"])))
+    rows = [
+        {
+            "id": r.pk,
+            "reference_no": r.reference_no,
+            "doc_type": {"name": r.doc_type.name},
+            "status": r.status,
+            "requested_at": r.requested_at.isoformat(),
+        }
+        for r in qs.select_related("doc_type").order_by("-requested_at")[:RECENT_LIMIT]
+    ]
+    return {"open_requests": stats["open"]}, rows
+
+
+def _appointments(student_id):
+    qs = Appointment.objects.filter(student_id=student_id)
+    upcoming = Q(status__in=["PENDING", "CONFIRMED"], schedule__gte=timezone.now())
+    stats = qs.aggregate(
+        upcoming=Count("id", filter=upcoming),
+        next=Min("schedule", filter=upcoming),
+    )
+    rows = [
+        {"id": a.pk, "office": a.office, "topic": a.topic, "status": a.status, "schedule": a.schedule.isoformat()}
+        for a in qs.order_by("-schedule")[:RECENT_LIMIT]
+    ]
+    return {"upcoming_appointments": stats["upcoming"], "next_appointment": stats["next"]}, rows
+
+
+def _payments(student_id):
+    qs = FeePayment.objects.filter(student_id=student_id)
+    stats = qs.aggregate(
+        pending=Count("id", filter=Q(status="PENDING")),
+        pending_total=Sum("amount", filter=Q(status="PENDING")),
+    )
+    rows = [
+        {"id": p.pk, "fee_name": p.fee_name, "amount": str(p.amount), "status": p.status, "paid_at": p.paid_at.isoformat()}
+        for p in qs.order_by("-paid_at")[:RECENT_LIMIT]
+    ]
+    fields = {"pending_payments": stats["pending"], "pending_payment_total": stats["pending_total"] or 0}
+    return fields, rows
+
+
+def _inquiries(student_id):
+    qs = Inquiry.objects.filter(student_id=student_id)
+    stats = qs.aggregate(unanswered=Count("id", filter=Q(status="OPEN")))
+    rows = [
+        {"id": i.pk, "subject": i.subject, "status": i.status, "created_at": i.created_at.isoformat()}
+        for i in qs.order_by("-created_at")[:RECENT_LIMIT]
+    ]
+    return {"unanswered_inquiries": stats["unanswered"]}, rows
+
+
+BUILDERS = {
+    "requests": _requests,
+    "appointments": _appointments,
+    "payments": _payments,
+    "inquiries": _inquiries,
+}
+
+
+def _last_activity(student_id):
+    latest = [
+        model.objects.filter(student_id=student_id).aggregate(latest=Max(field))["latest"]
+        for model, field in ACTIVITY.values()
+    ]
+    return max((t for t in latest if t), default=None)
+
+
+def refresh(student_id, kinds=None):
+    """Recompute the given kinds (default: all) of a student's summary row.
+
+    Only the kinds touched by a write are rebuilt, from that one student's
+    rows, so keeping the summary current costs two indexed queries per kind.
+    ``last_activity`` is always taken from all four kinds, since a delete or
+    archiving run can move it back. The row is locked first, so two refreshes of different kinds
+    (a request and a payment saved together) can't each write back the other's
+    stale columns; an UPDATE locks it on every backend, SQLite included.
+    """
+    if not StudentProfile.objects.filter(pk=student_id).exists():
+        return None
+
+    with transaction.atomic(using=shards.alias()):
+        StudentSummary.objects.filter(student_id=student_id).update(updated_at=timezone.now())
+        summary, created = StudentSummary.objects.get_or_create(student_id=student_id)
+        kinds = list(BUILDERS) if created or kinds is None else kinds
+        recent = dict(summary.recent)
+        changed = {"recent", "last_activity", "updated_at"}
+
+        for kind in kinds:
+            fields, rows = BUILDERS[kind](student_id)
+            for name, value in fields.items():
+                setattr(summary, name, value)
+            changed.update(fields)
+            recent[kind] = rows
+
+        summary.recent = recent
+        summary.last_activity = _last_activity(student_id)
+        summary.save(update_fields=changed)
+    return summary
+
+
+def for_student(profile):
+    summary = StudentSummary.objects.filter(student=profile).first()
+    if summary is None:
+        return refresh(profile.pk)
+    if summary.next_appointment and summary.next_appointment < timezone.now():
+        return refresh(profile.pk, ["appointments"])
+    return summary
+
+
+def recent_items(summary, kind):
+    items = []
+    for row in summary.recent.get(kind, []):
+        row = dict(row)
+        for key in DATE_KEYS[kind]:
+            if row.get(key):
+                row[key] = datetime.fromisoformat(row[key])
+        items.append(row)
+    return items
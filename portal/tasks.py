@@ -0,0 +1,70 @@
+import logging
+
+from django.apps import apps
+from django.utils import timezone
+
+from . import notifications, printables, proofs, sla
+from .jobs import task
+from .models import DocumentRequest, Notification, PaymentProof
+
+logger = logging.getLogger(__name__)
+
+TRACKED_MODELS = ("DocumentRequest", "Appointment", "FeePayment", "Inquiry")
+
+
+def describe(obj):
+    model = obj.__class__.__name__
+    if model == "DocumentRequest":
+        return f"Document request {obj.reference_no} ({obj.doc_type.name})"
+    if model == "Appointment":
+        return f"Appointment at {obj}"
+    if model == "FeePayment":
+        return f"Payment for {obj.fee_name} (₱{obj.amount})"
+    return f"Inquiry \"{obj.subject}\""
+
+
+@task("portal.notify_status")
+def notify_status(model, pk, status):
+    if model not in TRACKED_MODELS:
+        raise ValueError(f"Unsupported model: {model}")
+    Model = apps.get_model("portal", model)
+    obj = Model.objects.select_related("student").filter(pk=pk).first()
+    if obj is None:
+        return
+
+    label = dict(Model.STATUS_CHOICES).get(status, status)
+    notifications.record(obj.student, model, obj.pk, status, f"{describe(obj)} is now {label}.")
+
+
+@task("portal.render_printable")
+def render_printable(model, pk):
+    Model = apps.get_model("portal", model)
+    obj = printables.queryset(Model).filter(pk=pk).first()
+    if obj is not None and printables.is_printable(obj):
+        printables.ensure(obj)
+
+
+@task("portal.thumbnail_proof")
+def thumbnail_proof(pk):
+    proof = PaymentProof.objects.filter(pk=pk).first()
+    if proof is None or proof.content_type not in proofs.IMAGE_TYPES:
+        return
+    proofs.make_thumbnail(proof.sha256)
+    PaymentProof.objects.filter(sha256=proof.sha256).update(has_thumbnail=True)
+
+
+@task("portal.reschedule_doc_type")
+def reschedule_doc_type(doc_type):
+    """Recompute the due dates of open requests for a document type whose processing days changed."""
+    sla.reschedule(DocumentRequest.objects.filter(doc_type=doc_type, status__in=sla.OPEN_STATUSES))
+
+
+@task("portal.flush_digests")
+def flush_digests():
+    stats = notifications.flush_digests()
+    logger.info("Digest flush: %(events)s events -> %(digests)s emails (%(coalesced)s coalesced), %(rate).1f/s", stats)
+
+    oldest = Notification.objects.filter(sent_at__isnull=True).order_by("created_at").first()
+    if oldest:
+        wait = (oldest.created_at + notifications.digest_window() - timezone.now()).total_seconds()
+        notifications.schedule_flush(max(wait, 0))
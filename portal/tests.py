@@ -1,3 +1,693 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.db import OperationalError, connections
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from portal import archive, groupcommit, jobs, metrics, notifications, proofs, ratelimit, shards, sla, summaries
+from portal.events import broker
+from portal.admin import EstimatedCountPaginator
+from portal.models import ArchivedRecord, DocumentRequest, DocumentType, FeePayment, Inquiry, Job, Notification, PaymentProof, StudentProfile, StudentSummary
+
+# A second campus database for the multi-campus tests. Registered before the
+# runner sets up databases, so it gets its own test database like default.
+CAMPUS_DB = "campus_b"
+_default = connections.settings["default"]
+connections.settings.setdefault(CAMPUS_DB, {**_default, "TEST": dict(_default["TEST"])})
+TWO_CAMPUSES = {
+    "a": {"name": "Campus A", "database": "default"},
+    "b": {"name": "Campus B", "database": CAMPUS_DB},
+}
+# Metrics snapshots from the test requests go to a throwaway directory, not var/.
+_metrics_dir = tempfile.TemporaryDirectory()
+_metrics_settings = override_settings(METRICS_DIR=_metrics_dir.name)
+
+
+def setUpModule():
+    _metrics_settings.enable()
+
+
+def tearDownModule():
+    _metrics_settings.disable()
+    # Nothing left for the exit-time flush to write.
+    with metrics._lock:
+        metrics._requests.clear()
+        metrics._views.clear()
+    _metrics_dir.cleanup()
+
+
+class StaticAssetsTests(TestCase):
+    def test_pages_render_before_collectstatic(self):
+        # The test runner forces DEBUG=False; with no manifest the plain URL is used.
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            response = self.client.get("/accounts/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/static/vendor/bootstrap-5.3.8/css/bootstrap.min.css")
+
+
+def make_student(username, email=None):
+    user = User.objects.create_user(username, email if email is not None else f"{username}@example.com", "pw")
+    return StudentProfile.objects.create(user=user, student_id=f"2024-{username}", course="BSCS", year_level=1)
+
+
+class FailingBackend(locmem.EmailBackend):
+    """Delivers ``limit`` messages, then raises."""
+
+    limit = 1
+
+    def send_messages(self, messages):
+        if len(mail.outbox) >= self.limit:
+            raise ConnectionError("SMTP server went away")
+        return super().send_messages(messages)
+
+
+class RejectingBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        return 0
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", NOTIFICATION_BATCH_SIZE=10)
+class DigestTests(TestCase):
+    def setUp(self):
+        self.students = [make_student(f"s{i}") for i in range(3)]
+        for student in self.students:
+            for status in ("APPROVED", "RELEASED"):
+                Notification.objects.create(
+                    student=student, model="DocumentRequest", object_id=1, status=status, message=f"Request {status}"
+                )
+
+    def test_one_digest_per_student(self):
+        stats = notifications.flush_digests(window=timedelta(0))
+        self.assertEqual((stats["events"], stats["digests"], stats["sent"]), (6, 3, 3))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("Request RELEASED", mail.outbox[0].body)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_failure_midway_keeps_only_undelivered_pending(self):
+        with self.assertRaises(ConnectionError):
+            notifications.flush_digests(window=timedelta(0), connection=FailingBackend())
+        self.assertEqual(len(mail.outbox), 1)
+        pending = set(Notification.objects.filter(sent_at__isnull=True).values_list("student_id", flat=True))
+        self.assertEqual(pending, {s.pk for s in self.students[1:]})
+
+        stats = notifications.flush_digests(window=timedelta(0))
+        self.assertEqual(stats["sent"], 2)
+        self.assertEqual([m.to for m in mail.outbox], [[s.user.email] for s in self.students])
+
+    def test_undelivered_digests_stay_pending(self):
+        stats = notifications.flush_digests(window=timedelta(0), connection=RejectingBackend())
+        self.assertEqual(stats["sent"], 0)
+        self.assertEqual(Notification.objects.filter(sent_at__isnull=True).count(), 6)
+
+    def test_students_without_email_are_skipped(self):
+        Notification.objects.create(
+            student=make_student("noemail", email=""), model="DocumentRequest", object_id=2, status="APPROVED", message="x"
+        )
+        stats = notifications.flush_digests(window=timedelta(0))
+        self.assertEqual(stats["digests"], 3)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+
+class LiveUpdatesTests(TestCase):
+    SUBSCRIBERS = 300
+
+    def setUp(self):
+        self.staff = User.objects.create_user("staff", "staff@example.com", "pw", is_staff=True)
+
+    def test_wsgi_pages_leave_the_stream_out(self):
+        self.client.force_login(self.staff)
+        self.assertNotContains(self.client.get("/dashboard/"), "EventSource")
+        self.assertEqual(self.client.get("/events/").status_code, 204)
+
+    async def test_fan_out_to_hundreds_of_subscribers(self):
+        client = AsyncClient()
+        await client.aforce_login(self.staff)
+        self.assertContains(await client.get("/dashboard/"), "EventSource")
+
+        responses = await asyncio.gather(*(client.get("/events/") for _ in range(self.SUBSCRIBERS)))
+        streams = [response.streaming_content for response in responses]
+        for stream in streams:
+            self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        self.assertEqual(len(broker), self.SUBSCRIBERS)
+
+        # Views publish from worker threads, not the event loop.
+        event = {"model": "DocumentRequest", "id": 1, "action": "updated", "status": "APPROVED"}
+        await asyncio.to_thread(broker.publish, event)
+        received = await asyncio.wait_for(asyncio.gather(*(anext(stream) for stream in streams)), timeout=5)
+        self.assertTrue(all(chunk.startswith(b"event: DocumentRequest\n") for chunk in received))
+
+        # A client disconnect cancels the pending read, as the ASGI server does.
+        reads = [asyncio.create_task(anext(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        for read in reads:
+            read.cancel()
+        await asyncio.gather(*reads, return_exceptions=True)
+        self.assertEqual(len(broker), 0)
+
+
+class WorkQueueTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice", password="pw", is_staff=True)
+        self.bob = User.objects.create_user("bob", password="pw", is_staff=True)
+        doc_type = DocumentType.objects.create(name="TOR", fee=100, processing_days=3)
+        student = make_student("s1")
+        self.requests = [
+            DocumentRequest.objects.create(reference_no=f"DR{i}", student=student, doc_type=doc_type, purpose="Work")
+            for i in range(3)
+        ]
+        self.client.force_login(self.alice)
+
+    def claimed_by(self, user):
+        return set(DocumentRequest.objects.filter(claimed_by=user).values_list("pk", flat=True))
+
+    def test_viewing_pages_claims_nothing(self):
+        self.client.get(f"/requests/{self.requests[0].pk}/process/")
+        self.client.get("/work/requests/")
+        self.assertEqual(self.claimed_by(self.alice), set())
+
+    def test_claim_and_release(self):
+        response = self.client.post("/work/requests/", {"n": 2})
+        self.assertRedirects(response, "/work/requests/?n=2")
+        first, second = self.requests[:2]
+        self.assertEqual(self.claimed_by(self.alice), {first.pk, second.pk})
+        self.assertContains(self.client.get("/work/requests/"), f"/work/requests/{first.pk}/release/")
+
+        self.client.post(f"/work/requests/{first.pk}/release/")
+        self.assertEqual(self.claimed_by(self.alice), {second.pk})
+
+    def test_held_items_are_locked_for_other_staff(self):
+        self.client.post("/work/requests/", {"n": 1})
+        held = self.requests[0]
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(f"/requests/{held.pk}/process/").status_code, 403)
+        response = self.client.post(f"/requests/{held.pk}/process/", {"status": "APPROVED", "remarks": ""})
+        self.assertEqual(response.status_code, 403)
+        held.refresh_from_db()
+        self.assertEqual(held.status, "PENDING")
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.student = make_student("s1")
+        old = timezone.now() - timedelta(days=400)
+        self.verified, self.pending = [
+            FeePayment.objects.create(student=self.student, fee_name="Library fine", amount=50, reference=f"OR-{status}", status=status)
+            for status in ("VERIFIED", "PENDING")
+        ]
+        FeePayment.objects.update(created_at=old)
+
+    def test_old_closed_rows_move_to_the_archive(self):
+        self.assertEqual(archive.archive("FeePayment", 365), 1)
+        self.assertEqual(list(FeePayment.objects.all()), [self.pending])
+        record = ArchivedRecord.objects.get()
+        self.assertEqual((record.original_id, record.status, record.reference), (self.verified.pk, "VERIFIED", "OR-VERIFIED"))
+
+    def test_archived_rows_are_found_with_archived_flag(self):
+        archive.archive("FeePayment", 365)
+        self.client.force_login(User.objects.create_user("staff", password="pw", is_staff=True))
+        self.assertNotContains(self.client.get("/payments/?q=OR-VERIFIED"), "Ref: OR-VERIFIED")
+        self.assertContains(self.client.get("/payments/?q=OR-VERIFIED&archived=1"), "Ref: OR-VERIFIED")
+
+    def test_archived_payment_keeps_its_proof_files(self):
+        sha256 = "ab" * 32
+        with tempfile.TemporaryDirectory() as root, override_settings(PAYMENT_PROOF_DIR=root):
+            proofs.blob_path(sha256).parent.mkdir(parents=True)
+            proofs.blob_path(sha256).write_bytes(b"%PDF-1.4")
+            PaymentProof.objects.create(payment=self.verified, sha256=sha256, size=8, content_type="application/pdf", original_name="or.pdf")
+            with self.captureOnCommitCallbacks(execute=True):
+                archive.archive("FeePayment", 365)
+            self.assertFalse(PaymentProof.objects.exists())
+            self.assertTrue(proofs.blob_path(sha256).exists())
+        [proof] = ArchivedRecord.objects.get().data["proofs"]
+        self.assertEqual((proof["sha256"], proof["original_name"], proof["content_type"]), (sha256, "or.pdf", "application/pdf"))
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def fail(**payload):
+            raise RuntimeError("mail server down")
+
+        tasks = mock.patch.dict(jobs.TASKS, {"test.ok": lambda **payload: self.calls.append(payload), "test.fail": fail})
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def test_claims_are_exclusive_until_the_lease_runs_out(self):
+        queued = {Job.objects.create(task="test.ok").pk for _ in range(3)}
+        first = {job.pk for job in jobs.claim("a", limit=2)}
+        second = {job.pk for job in jobs.claim("b", limit=5)}
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertEqual(first | second, queued)
+        self.assertEqual(jobs.claim("c"), [])
+
+        Job.objects.filter(pk__in=first).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual({job.pk for job in jobs.claim("c")}, first)
+
+    def test_done_job_is_not_claimed_again(self):
+        Job.objects.create(task="test.ok", payload={"n": 1})
+        [job] = jobs.claim("a")
+        self.assertTrue(jobs.run_job(job, "a"))
+        self.assertEqual(self.calls, [{"n": 1}])
+        self.assertEqual(Job.objects.get().status, "DONE")
+        self.assertEqual(jobs.claim("a"), [])
+
+    def test_failure_is_retried_with_backoff(self):
+        Job.objects.create(task="test.fail")
+        [job] = jobs.claim("a")
+        self.assertFalse(jobs.run_job(job, "a"))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ("PENDING", 1, ""))
+        self.assertIn("mail server down", job.last_error)
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), jobs.RETRY_BASE_SECONDS, delta=2)
+        self.assertEqual(jobs.claim("a"), [])
+        self.assertEqual([jobs.backoff(n) for n in (1, 2, 3)], [jobs.RETRY_BASE_SECONDS * 2 ** n for n in range(3)])
+        self.assertEqual(jobs.backoff(50), jobs.RETRY_MAX_SECONDS)
+
+    def test_job_fails_for_good_after_its_last_attempt(self):
+        Job.objects.create(task="test.fail", max_attempts=2)
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            [job] = jobs.claim("a")
+            jobs.run_job(job, "a")
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ("FAILED", 2))
+        self.assertIsNotNone(job.finished_at)
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.claim("a"), [])
+
+
+class DueDateTests(TestCase):
+    FRIDAY = datetime(2026, 1, 16, 10, 0)
+
+    def at(self, day, hour=17):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_business_days_skip_weekends_and_holidays(self):
+        friday = timezone.make_aware(self.FRIDAY)
+        self.assertEqual(sla.due_at(friday, 1), self.at(date(2026, 1, 19)))
+        self.assertEqual(sla.due_at(friday, 5), self.at(date(2026, 1, 23)))
+        saturday = friday + timedelta(days=1)
+        self.assertEqual(sla.due_at(saturday, 0), self.at(date(2026, 1, 19)))
+        with override_settings(SLA_HOLIDAYS=["2026-01-19"]):
+            self.assertEqual(sla.due_at(friday, 1), self.at(date(2026, 1, 20)))
+
+    def test_data_migration_schedules_existing_requests(self):
+        migration = importlib.import_module("portal.migrations.0012_documentrequest_due_at")
+        student = make_student("s1")
+        types = [DocumentType.objects.create(name=f"Type {days}", fee=0, processing_days=days) for days in (0, 1, 3)]
+        for i in range(12):
+            obj = DocumentRequest.objects.create(reference_no=f"DR{i}", student=student, doc_type=types[i % 3], purpose="Work")
+            DocumentRequest.objects.filter(pk=obj.pk).update(requested_at=timezone.make_aware(self.FRIDAY) - timedelta(hours=17 * i), due_at=None)
+
+        migration.schedule_existing(django_apps, None)
+        for obj in DocumentRequest.objects.select_related("doc_type"):
+            self.assertEqual(obj.due_at, sla.due_at(obj.requested_at, obj.doc_type.processing_days))
+
+    def test_changing_processing_days_reschedules_open_requests(self):
+        doc_type = DocumentType.objects.create(name="TOR", fee=100, processing_days=1)
+        student = make_student("s1")
+        open_, closed = [
+            DocumentRequest.objects.create(reference_no=f"DR{status}", student=student, doc_type=doc_type, purpose="Work", status=status)
+            for status in ("PENDING", "RELEASED")
+        ]
+        DocumentRequest.objects.update(requested_at=timezone.make_aware(self.FRIDAY), due_at=self.at(date(2026, 1, 19)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            doc_type.processing_days = 3
+            doc_type.save()
+        for job in jobs.claim("test"):
+            self.assertTrue(jobs.run_job(job, "test"))
+
+        open_.refresh_from_db()
+        closed.refresh_from_db()
+        self.assertEqual(open_.due_at, self.at(date(2026, 1, 21)))
+        self.assertEqual(closed.due_at, self.at(date(2026, 1, 19)))
+
+
+class SummaryTests(TestCase):
+    def setUp(self):
+        self.student = make_student("s1")
+        self.doc_type = DocumentType.objects.create(name="TOR", fee=100, processing_days=3)
+
+    def file_request(self, reference_no, days_ago):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj = DocumentRequest.objects.create(reference_no=reference_no, student=self.student, doc_type=self.doc_type, purpose="Work")
+        DocumentRequest.objects.filter(pk=obj.pk).update(requested_at=timezone.now() - timedelta(days=days_ago))
+        return obj
+
+    def test_last_activity_moves_back_after_a_delete(self):
+        self.file_request("DR1", 5)
+        newer = self.file_request("DR2", 1)
+        summaries.refresh(self.student.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            newer.delete()
+        older = DocumentRequest.objects.get()
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.pk).last_activity, older.requested_at)
+
+    def test_refresh_keeps_columns_of_other_kinds(self):
+        summaries.refresh(self.student.pk)
+        real = summaries.BUILDERS["requests"]
+
+        def build(student_id):
+            # A payment refresh for the same student lands meanwhile.
+            StudentSummary.objects.filter(pk=student_id).update(pending_payments=1)
+            return real(student_id)
+
+        with mock.patch.dict(summaries.BUILDERS, requests=build):
+            summaries.refresh(self.student.pk, ["requests"])
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.pk).pending_payments, 1)
+
+
+class SummaryRefreshFailureTests(TransactionTestCase):
+    def test_failed_refresh_does_not_fail_the_save(self):
+        def refresh(student_id, kinds=None):
+            raise OperationalError("database is locked")
+
+        student = make_student("s1")
+        doc_type = DocumentType.objects.create(name="TOR", fee=100, processing_days=3)
+        with mock.patch.object(summaries, "refresh", refresh), self.assertLogs("django.db.backends.base", "ERROR"):
+            DocumentRequest.objects.create(reference_no="DR1", student=student, doc_type=doc_type, purpose="Work")
+        self.assertTrue(DocumentRequest.objects.filter(reference_no="DR1").exists())
+
+
+class ProofUploadTests(TestCase):
+    PDF = b"%PDF-1.4 proof of payment"
+    CSRF = "a" * 32
+
+    def setUp(self):
+        cache.clear()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        settings = override_settings(PAYMENT_PROOF_DIR=root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.student = make_student("s1")
+        self.payment = FeePayment.objects.create(student=self.student, fee_name="Tuition", amount=100)
+        # CSRF is checked for real, so the body is read (and the file staged) before the view runs.
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.cookies["csrftoken"] = self.CSRF
+        self.client.force_login(self.student.user)
+
+    def upload(self, payment=None, token=CSRF):
+        proof = SimpleUploadedFile("or.pdf", self.PDF, "application/pdf")
+        return self.client.post(f"/payments/{(payment or self.payment).pk}/proofs/", {"proof": proof, "csrfmiddlewaretoken": token})
+
+    def stored(self):
+        return sorted(path.name for path in self.root.rglob("*") if path.is_file())
+
+    def test_upload_is_stored_once_attached(self):
+        self.assertRedirects(self.upload(), "/payments/", fetch_redirect_response=False)
+        proof = PaymentProof.objects.get()
+        self.assertEqual(self.stored(), [proof.sha256])
+
+    def test_rejected_uploads_leave_no_file(self):
+        self.assertEqual(self.upload(token="b" * 32).status_code, 403)
+        other = FeePayment.objects.create(student=make_student("s2"), fee_name="Tuition", amount=100)
+        self.assertEqual(self.upload(other).status_code, 404)
+        self.payment.status = "VERIFIED"
+        self.payment.save()
+        self.assertEqual(self.upload().status_code, 403)
+        self.assertFalse(PaymentProof.objects.exists())
+        self.assertEqual(self.stored(), [])
+
+
+class InquiryDuplicateTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("staff", password="pw", is_staff=True))
+        text = {"subject": "Transcript of records request", "message": "When can I claim my transcript of records?"}
+        self.inquiry, self.twin = [Inquiry.objects.create(student=make_student(name), **text) for name in ("s1", "s2")]
+
+    def process(self, **extra):
+        data = {"status": "ANSWERED", "reply": "Your transcript is ready for pickup.", **extra}
+        return self.client.post(f"/inquiries/{self.inquiry.pk}/process/", data)
+
+    def test_duplicates_are_offered_unticked(self):
+        response = self.client.get(f"/inquiries/{self.inquiry.pk}/process/")
+        self.assertContains(response, f'name="also" value="{self.twin.pk}" id="also-{self.twin.pk}">')
+
+    def test_only_ticked_duplicates_get_the_reply(self):
+        self.process()
+        self.twin.refresh_from_db()
+        self.assertEqual((self.twin.status, self.twin.reply), ("OPEN", ""))
+
+        self.inquiry.status = "OPEN"
+        self.inquiry.save()
+        self.process(also=[self.twin.pk])
+        self.twin.refresh_from_db()
+        self.assertEqual((self.twin.status, self.twin.reply), ("ANSWERED", "Your transcript is ready for pickup."))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def register(self, **headers):
+        return self.client.post("/register/", {"username": ""}, **headers)
+
+    @override_settings(RATE_LIMITS={"submit": {"user": (2, 3600)}})
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        codes = [self.register(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}").status_code for i in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+
+    @override_settings(RATE_LIMITS={"submit": {"user": (1, 3600)}}, RATE_LIMIT_PROXY_COUNT=1)
+    def test_trusted_proxy_hop_picks_the_bucket(self):
+        self.assertEqual(self.register(HTTP_X_FORWARDED_FOR="6.6.6.6, 10.0.0.1").status_code, 200)
+        self.assertEqual(self.register(HTTP_X_FORWARDED_FOR="7.7.7.7, 10.0.0.2").status_code, 200)
+        self.assertEqual(self.register(HTTP_X_FORWARDED_FOR="8.8.8.8, 10.0.0.2").status_code, 429)
+
+    @override_settings(RATE_LIMITS={"submit": {"user": (2, 3600), "global": (1, 3600)}})
+    def test_global_rejection_refunds_the_client(self):
+        self.assertEqual(self.register().status_code, 200)
+        self.assertEqual(self.register().status_code, 429)
+        with override_settings(RATE_LIMITS={"submit": {"user": (2, 3600)}}):
+            self.assertEqual(self.register().status_code, 200)
+
+    def test_take_reports_the_wait(self):
+        self.assertEqual([ratelimit.take("k", 2, 3600) for _ in range(2)], [0, 0])
+        wait = ratelimit.take("k", 2, 3600)
+        self.assertTrue(0 < wait <= 3600)
+        ratelimit.refund("k", 3600)
+        self.assertEqual(ratelimit.take("k", 2, 3600), 0)
+
+    def test_fallback_counters_expire_and_are_capped(self):
+        store = ratelimit.LocalStore(max_entries=2)
+        with mock.patch.object(ratelimit, "_local_counts", store), mock.patch.object(ratelimit.cache, "add", side_effect=ConnectionError):
+            self.assertEqual(ratelimit.take("k", 1, 3600), 0)
+            self.assertGreater(ratelimit.take("k", 1, 3600), 0)
+            for client in ("a", "b", "c"):
+                ratelimit.take(client, 1, 3600)
+            self.assertEqual(len(store._data), 2)
+        self.assertEqual(store.incr("n", 1, 60), 1)
+        with mock.patch("portal.ratelimit.time.monotonic", return_value=ratelimit.time.monotonic() + 61):
+            self.assertIsNone(store.get("n"))
+            self.assertEqual(store.incr("n", 1, 60), 1)
+
+
+class IdempotencyTests(TestCase):
+    KEY = "retry-key-0001"
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(make_student("s1").user)
+
+    def pay(self, **data):
+        return self.client.post(
+            "/payments/new/",
+            {"fee_name": "Lab Fee", "amount": "100.00", "reference": "OR-1", "paid_at": "2026-01-15 09:00", "idempotency_key": self.KEY, **data},
+        )
+
+    def test_replayed_key_returns_the_original_redirect(self):
+        first = self.pay()
+        second = self.pay()
+        self.assertEqual(FeePayment.objects.count(), 1)
+        self.assertEqual((second.status_code, second["Location"]), (302, first["Location"]))
+
+    def test_invalid_form_releases_the_key(self):
+        self.assertEqual(self.pay(amount="not a number").status_code, 200)
+        self.assertEqual(FeePayment.objects.count(), 0)
+        self.assertEqual(self.pay().status_code, 302)
+        self.assertEqual(FeePayment.objects.count(), 1)
+
+
+class GroupCommitTests(TestCase):
+    def test_leader_failure_reaches_every_caller(self):
+        committer = groupcommit.GroupCommitter(window=5, max_batch=3)
+        doc_type = DocumentType(pk=1, name="TOR", fee=100, processing_days=3)
+
+        def submit(i):
+            try:
+                committer.save(DocumentRequest(student_id=1, doc_type=doc_type, purpose=f"Burst {i}"))
+            except RuntimeError as exc:
+                return str(exc)
+            return "saved"
+
+        with mock.patch.object(DocumentRequest, "make_reference", side_effect=RuntimeError("no reference")):
+            with ThreadPoolExecutor(3) as pool:
+                results = list(pool.map(submit, range(3)))
+        self.assertEqual(results, ["no reference"] * 3)
+
+
+class AdminChangelistTests(TestCase):
+    ROWS = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        students = [make_student(f"adm{i}") for i in range(50)]
+        types = [DocumentType.objects.create(name=f"Document {i}", fee=50, processing_days=3) for i in range(5)]
+        DocumentRequest.objects.bulk_create(
+            (
+                DocumentRequest(
+                    reference_no=f"DR{i:012d}", student=students[i % 50], doc_type=types[i % 5], purpose="Scholarship"
+                )
+                for i in range(cls.ROWS)
+            ),
+            batch_size=5000,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_queries_do_not_grow_with_the_table(self):
+        for url, queries in (
+            ("/admin/portal/documentrequest/", 6),
+            ("/admin/portal/documentrequest/?p=3", 6),
+            ("/admin/portal/documentrequest/?q=DR00000001234", 6),
+            ("/admin/portal/documentrequest/?q=2024-adm7", 6),
+            (f"/admin/portal/documentrequest/{DocumentRequest.objects.values_list('pk', flat=True).first()}/change/", 9),
+        ):
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_estimated_count_follows_archiving(self):
+        paginator = EstimatedCountPaginator(DocumentRequest.objects.order_by("-pk"), 50)
+        self.assertEqual(paginator.count, self.ROWS)
+        DocumentRequest.objects.filter(pk__in=DocumentRequest.objects.order_by("pk").values("pk")[:40_000]).delete()
+        paginator = EstimatedCountPaginator(DocumentRequest.objects.order_by("-pk"), 50)
+        self.assertEqual(paginator.count, self.ROWS - 40_000)
+
+
+class MetricsTests(TestCase):
+    def test_short_lived_threads_share_the_counters(self):
+        before = metrics.snapshot()[0][("test_view", "GET", 200)]
+        threads = [threading.Thread(target=metrics.record, args=("test_view", "GET", 200, 0.01, 0.0, 0, 0.0)) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(metrics.snapshot()[0][("test_view", "GET", 200)], before + 50)
+
+    def test_unknown_methods_share_one_series(self):
+        self.client.generic("BREW", "/accounts/login/")
+        self.client.generic("BREW2", "/accounts/login/")
+        methods = {method for view, method, _ in metrics.snapshot()[0] if view == "login"}
+        self.assertEqual(methods - metrics.METHODS, {"other"})
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_scraper_token(self):
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer \u00e9t\u00e9").status_code, 403)
+
+    def test_label_values_are_escaped(self):
+        text = metrics.render({("v", 'GE"T\\', 200): 1}, {})
+        self.assertIn('method="GE\\"T\\\\"', text)
+
+
+@override_settings(CAMPUSES=TWO_CAMPUSES, DEFAULT_CAMPUS="a")
+class FanOutMetricsTests(TransactionTestCase):
+    databases = {"default", CAMPUS_DB}
+
+    def test_pool_queries_count_toward_the_request(self):
+        timing = metrics._local.timing = {"db": 0.0, "queries": 0, "template": 0.0}
+        try:
+            shards.gather(lambda: list(DocumentRequest.objects.all()))
+        finally:
+            metrics._local.timing = None
+        self.assertEqual(timing["queries"], 2)
+        self.assertGreater(timing["db"], 0)
+
+
+@override_settings(CAMPUSES=TWO_CAMPUSES, DEFAULT_CAMPUS="a")
+class CampusShardingTests(TransactionTestCase):
+    databases = {"default", CAMPUS_DB}
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("staff", password="pw", is_staff=True))
+        doc_type = DocumentType.objects.create(name="TOR", fee=100, processing_days=3)
+        now = timezone.now()
+        # The same pks in both campuses, filed alternately: a1, b1, a2, b2.
+        for campus, offset in (("a", 0), ("b", 1)):
+            with shards.use(campus):
+                student = make_student(f"s{campus}")
+                for pk in (1, 2):
+                    DocumentRequest.objects.create(pk=pk, reference_no=f"DR{campus}{pk}", student=student, doc_type=doc_type, purpose="Work")
+                    DocumentRequest.objects.filter(pk=pk).update(requested_at=now - timedelta(hours=10 - 2 * pk - offset))
+
+    def test_rows_go_to_their_campus_database(self):
+        with shards.use("b"):
+            profile = make_student("s3")
+        self.assertEqual(profile.campus, "b")
+        self.assertTrue(StudentProfile.objects.using(CAMPUS_DB).filter(pk=profile.pk, user__username="s3").exists())
+        self.assertFalse(StudentProfile.objects.using("default").filter(user__username="s3").exists())
+
+    def test_staff_list_merges_every_campus_newest_first(self):
+        items = self.client.get("/requests/").context["items"]
+        self.assertEqual([r.reference_no for r in items], ["DRb2", "DRa2", "DRb1", "DRa1"])
+
+    def test_same_pk_opens_the_record_of_the_named_campus(self):
+        self.assertContains(self.client.get("/requests/1/?campus=a"), "Request DRa1")
+        self.assertContains(self.client.get("/requests/1/?campus=b"), "Request DRb1")
+
+    def test_record_pages_need_the_campus(self):
+        self.client.get("/requests/1/?campus=b")
+        self.assertEqual(self.client.get("/requests/1/").status_code, 404)
+        self.assertEqual(self.client.get("/requests/1/process/").status_code, 404)
+        self.assertEqual(self.client.get("/requests/1/?campus=c").status_code, 404)
+
+    def test_processing_changes_only_the_named_campus(self):
+        response = self.client.post("/requests/1/process/?campus=b", {"status": "APPROVED", "remarks": ""})
+        self.assertRedirects(response, "/requests/1/?campus=b")
+        with shards.use("a"):
+            self.assertEqual(DocumentRequest.objects.get(pk=1).status, "PENDING")
+        with shards.use("b"):
+            self.assertEqual(DocumentRequest.objects.get(pk=1).status, "APPROVED")
+
+    def test_fee_report_and_admin_name_the_working_campus(self):
+        self.client.get("/dashboard/?campus=b")
+        self.assertContains(self.client.get("/reports/"), "Campus B")
+        self.assertIn("b-fees-report.csv", self.client.get("/reports/fees.csv")["Content-Disposition"])
+        User.objects.filter(username="staff").update(is_superuser=True)
+        self.assertContains(self.client.get("/admin/portal/documentrequest/"), "(Campus B)")
+
+    def test_shared_proof_file_outlives_one_campus_delete(self):
+        sha256 = "cd" * 32
+        with tempfile.TemporaryDirectory() as root, override_settings(PAYMENT_PROOF_DIR=root):
+            proofs.blob_path(sha256).parent.mkdir(parents=True)
+            proofs.blob_path(sha256).write_bytes(b"%PDF-1.4")
+            uploaded = {}
+            for campus in ("a", "b"):
+                with shards.use(campus):
+                    payment = FeePayment.objects.create(student=StudentProfile.objects.get(), fee_name="Tuition", amount=100)
+                    uploaded[campus] = PaymentProof.objects.create(payment=payment, sha256=sha256, size=8, content_type="application/pdf", original_name="or.pdf")
+            with shards.use("a"):
+                uploaded["a"].delete()
+            self.assertTrue(proofs.blob_path(sha256).exists())
+            with shards.use("b"):
+                uploaded["b"].delete()
+            self.assertFalse(proofs.blob_path(sha256).exists())
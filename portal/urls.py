@@ -5,6 +5,13 @@ urlpatterns = [
     path("", views.home, name="home"),
     path("register/", views.register, name="register"),
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("events/", views.staff_events, name="staff_events"),
+    path("work/<str:kind>/", views.work_next, name="work_next"),
+    path("work/<str:kind>/<int:pk>/release/", views.work_release, name="work_release"),
+    path("students/lookup/", views.student_lookup, name="student_lookup"),
+    path("metrics/", views.staff_metrics, name="staff_metrics"),
+    path("reports/", views.fee_report, name="fee_report"),
+    path("reports/<str:table>.csv", views.fee_report, name="fee_report_csv"),
 
     path("document-types/", views.doc_type_list, name="doc_type_list"),
     path("document-types/new/", views.doc_type_create, name="doc_type_create"),
@@ -13,7 +20,9 @@ urlpatterns = [
 
     path("requests/", views.request_list, name="request_list"),
     path("requests/new/", views.request_create, name="request_create"),
+    path("requests/due/", views.request_due, name="request_due"),
     path("requests/<int:pk>/", views.request_detail, name="request_detail"),
+    path("requests/<int:pk>/slip.pdf", views.request_slip, name="request_slip"),
     path("requests/<int:pk>/edit/", views.request_update, name="request_update"),
     path("requests/<int:pk>/delete/", views.request_delete, name="request_delete"),
     path("requests/<int:pk>/process/", views.request_process, name="request_process"),
@@ -26,6 +35,10 @@ urlpatterns = [
 
     path("payments/", views.payment_list, name="payment_list"),
     path("payments/new/", views.payment_create, name="payment_create"),
+    path("payments/<int:pk>/receipt.pdf", views.payment_receipt, name="payment_receipt"),
+    path("payments/<int:pk>/proofs/", views.payment_proof_upload, name="payment_proof_upload"),
+    path("payments/proofs/<int:pk>/", views.payment_proof, name="payment_proof"),
+    path("payments/proofs/<int:pk>/thumbnail/", views.payment_proof_thumbnail, name="payment_proof_thumbnail"),
     path("payments/<int:pk>/edit/", views.payment_update, name="payment_update"),
     path("payments/<int:pk>/delete/", views.payment_delete, name="payment_delete"),
     path("payments/<int:pk>/process/", views.payment_process, name="payment_process"),
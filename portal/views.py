@@ -1,10 +1,24 @@
+import asyncio
+import hmac
+import json
+from collections import Counter
+from itertools import chain, zip_longest
+from operator import attrgetter
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Q, Count
-from django.http import HttpResponseForbidden
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.template.defaultfilters import filesizeformat, pluralize
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from . import archive, directory, groupcommit, idempotency, jobs, metrics, printables, proofs, reports, shards, sla, suggestions, summaries, workqueue
+from .events import broker, streaming
 from .forms import (
     RegisterForm,
     DocumentTypeForm,
@@ -17,14 +31,81 @@ from .forms import (
     InquiryForm,
     InquiryStaffForm,
 )
-from .models import StudentProfile, DocumentType, DocumentRequest, Appointment, FeePayment, Inquiry
+from .models import StudentProfile, DocumentType, DocumentRequest, Appointment, FeePayment, Inquiry, PaymentProof
+from .ratelimit import throttled
+
+DUE_QUEUE_LIMIT = 200
 
 def is_staff_user(user):
     return user.is_authenticated and user.is_staff
 
+def _student_match(q):
+    ids = directory.match_ids(q)
+    return Q(student__in=ids) if ids is not None else Q()
+
+def _merged(qs, field, limit=None):
+    """Rows of ``qs`` (ordered newest ``field`` first) from every campus, merged in that order."""
+    if limit is not None:
+        qs = qs[:limit]
+    runs = shards.gather(lambda: list(qs.all()))
+    return shards.merge(runs.values(), key=attrgetter(field), reverse=True, limit=limit)
+
+def _add_counts(runs):
+    """Sum per-campus ``[(status, total)]`` lists into the dashboard's ``[{status, total}]`` rows."""
+    totals = Counter()
+    for rows in runs:
+        totals.update(dict(rows))
+    return [{"status": status, "total": total} for status, total in sorted(totals.items())]
+
+def _claimed_elsewhere(request, obj):
+    """403 if another staff member holds ``obj``. Only a POST takes (or renews) the lease."""
+    if request.method == "POST":
+        if workqueue.claim_one(obj, request.user):
+            return None
+    elif workqueue.holder(obj) in (None, request.user):
+        return None
+    other = workqueue.holder(obj)
+    name = other.get_username() if other else "another staff member"
+    return HttpResponseForbidden(f"This item is currently being processed by {name}.")
+
+def _redirect_to(name, obj):
+    """Redirect to ``obj``'s ``name`` page, with its campus in the URL."""
+    return redirect(f"{reverse(name, args=[obj.pk])}?campus={obj.campus}")
+
+def _queue_status_notice(obj, old_status):
+    if obj.status != old_status:
+        jobs.enqueue("portal.notify_status", model=obj.__class__.__name__, pk=obj.pk, status=obj.status)
+        if printables.is_printable(obj):
+            jobs.enqueue("portal.render_printable", model=obj.__class__.__name__, pk=obj.pk)
+
+def _serve_printable(request, model, pk):
+    qs = printables.queryset(model)
+    if not request.user.is_staff:
+        profile = _profile_or_403(request.user)
+        if not profile:
+            return HttpResponseForbidden("Student profile not found.")
+        qs = qs.filter(student=profile)
+    obj = get_object_or_404(qs, pk=pk)
+    if not printables.is_printable(obj):
+        raise Http404("This document is not available yet.")
+
+    # Normally already rendered by the job queued on the status change; render now if not.
+    path = printables.ensure(obj)
+    name = printables.filename(obj)
+    accel = getattr(settings, "PRINTABLES_ACCEL_REDIRECT", "")
+    if accel:
+        response = HttpResponse(content_type="application/pdf")
+        response["X-Accel-Redirect"] = f"{accel.rstrip('/')}/{path.relative_to(printables.storage_dir()).as_posix()}"
+        response["Content-Disposition"] = f'inline; filename="{name}"'
+    else:
+        response = FileResponse(path.open("rb"), content_type="application/pdf", filename=name)
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
+
 def home(request):
     return render(request, "portal/home.html")
 
+@throttled("submit")
 def register(request):
     if request.user.is_authenticated:
         return redirect("dashboard")
@@ -38,15 +119,18 @@ def register(request):
             user.last_name = form.cleaned_data["last_name"]
             user.save()
 
-            StudentProfile.objects.create(
-                user=user,
-                student_id=form.cleaned_data["student_id"],
-                course=form.cleaned_data["course"],
-                year_level=form.cleaned_data["year_level"],
-                contact_no=form.cleaned_data.get("contact_no", ""),
-            )
+            campus = form.cleaned_data.get("campus") or shards.default_campus()
+            with shards.use(campus):
+                StudentProfile.objects.create(
+                    user=user,
+                    student_id=form.cleaned_data["student_id"],
+                    course=form.cleaned_data["course"],
+                    year_level=form.cleaned_data["year_level"],
+                    contact_no=form.cleaned_data.get("contact_no", ""),
+                )
 
             login(request, user)
+            request.session[shards.SESSION_KEY] = campus
             messages.success(request, "Account created. Welcome!")
             return redirect("dashboard")
     else:
@@ -66,13 +150,20 @@ def dashboard(request):
     staff = request.user.is_staff
 
     if staff:
-        req_counts = DocumentRequest.objects.values("status").annotate(total=Count("id")).order_by()
-        appt_counts = Appointment.objects.values("status").annotate(total=Count("id")).order_by()
-        pay_counts = FeePayment.objects.values("status").annotate(total=Count("id")).order_by()
-        inq_counts = Inquiry.objects.values("status").annotate(total=Count("id")).order_by()
+        def overview():
+            return (
+                [
+                    list(model.objects.values_list("status").annotate(total=Count("id")).order_by())
+                    for model in (DocumentRequest, Appointment, FeePayment, Inquiry)
+                ],
+                list(DocumentRequest.objects.select_related("student", "doc_type").order_by("-requested_at")[:8]),
+                list(Appointment.objects.select_related("student").order_by("-created_at")[:8]),
+            )
 
-        recent_requests = DocumentRequest.objects.select_related("student", "doc_type").order_by("-requested_at")[:8]
-        recent_appointments = Appointment.objects.select_related("student").order_by("-created_at")[:8]
+        runs = list(shards.gather(overview).values())
+        req_counts, appt_counts, pay_counts, inq_counts = (_add_counts(run[0][i] for run in runs) for i in range(4))
+        recent_requests = shards.merge((run[1] for run in runs), key=attrgetter("requested_at"), reverse=True, limit=8)
+        recent_appointments = shards.merge((run[2] for run in runs), key=attrgetter("created_at"), reverse=True, limit=8)
 
         return render(
             request,
@@ -84,29 +175,149 @@ def dashboard(request):
                 "inq_counts": inq_counts,
                 "recent_requests": recent_requests,
                 "recent_appointments": recent_appointments,
+                "live_updates": streaming(request),
             },
         )
 
     if not profile:
         return HttpResponseForbidden("Student profile not found.")
 
-    my_requests = profile.document_requests.select_related("doc_type").order_by("-requested_at")[:6]
-    my_appointments = profile.appointments.order_by("-schedule")[:6]
-    my_payments = profile.payments.order_by("-paid_at")[:6]
-    my_inquiries = profile.inquiries.order_by("-created_at")[:6]
+    summary = summaries.for_student(profile)
 
     return render(
         request,
         "portal/dashboard_student.html",
         {
             "profile": profile,
-            "my_requests": my_requests,
-            "my_appointments": my_appointments,
-            "my_payments": my_payments,
-            "my_inquiries": my_inquiries,
+            "summary": summary,
+            "my_requests": summaries.recent_items(summary, "requests"),
+            "my_appointments": summaries.recent_items(summary, "appointments"),
+            "my_payments": summaries.recent_items(summary, "payments"),
+            "my_inquiries": summaries.recent_items(summary, "inquiries"),
+        },
+    )
+
+async def staff_events(request):
+    user = await request.auser()
+    if not is_staff_user(user):
+        return HttpResponseForbidden("Staff only.")
+    if not streaming(request):
+        # 204 tells EventSource to stop reconnecting.
+        return HttpResponse(status=204)
+
+    sub = broker.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['model']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(sub)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@user_passes_test(is_staff_user)
+def student_lookup(request):
+    q = request.GET.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), 50))
+    except ValueError:
+        limit = 10
+    # Each campus ranks its own matches; take them in turns.
+    runs = shards.gather(lambda: directory.lookup(q, limit)).values()
+    profiles = [p for p in chain.from_iterable(zip_longest(*runs)) if p is not None][:limit]
+    results = [
+        {
+            "id": p.pk,
+            "student_id": p.student_id,
+            "name": p.user.get_full_name() or p.user.username,
+            "course": p.course,
+            "year_level": p.year_level,
+            "campus": p.campus,
+        }
+        for p in profiles
+    ]
+    return JsonResponse({"q": q, "results": results})
+
+@user_passes_test(is_staff_user)
+def work_next(request, kind):
+    if kind not in workqueue.QUEUES:
+        raise Http404("Unknown work queue.")
+    try:
+        limit = max(1, min(int(request.POST.get("n") or request.GET.get("n", 5)), 50))
+    except ValueError:
+        limit = 5
+    if request.method == "POST":
+        workqueue.claim_next(kind, request.user, limit)
+        return redirect(f"{request.path}?n={limit}")
+    _, _, _, process_url = workqueue.QUEUES[kind]
+    return render(
+        request,
+        "portal/work_queue.html",
+        {
+            "items": workqueue.held(kind, request.user),
+            "kind": kind,
+            "limit": limit,
+            "process_url": process_url,
+            "lease_minutes": int(workqueue.lease_length().total_seconds() // 60),
         },
     )
 
+@user_passes_test(is_staff_user)
+@shards.campus_in_url
+def work_release(request, kind, pk):
+    if kind not in workqueue.QUEUES:
+        raise Http404("Unknown work queue.")
+    if request.method != "POST":
+        return redirect("work_next", kind=kind)
+    obj = get_object_or_404(workqueue.QUEUES[kind][0], pk=pk)
+    workqueue.release(obj, request.user)
+    messages.info(request, f"Released {obj}.")
+    return redirect("work_next", kind=kind)
+
+def staff_metrics(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not (is_staff_user(request.user) or (token and hmac.compare_digest(bearer.encode(), token.encode()))):
+        return HttpResponseForbidden("Staff only.")
+    return HttpResponse(metrics.render(*metrics.collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@user_passes_test(is_staff_user)
+def fee_report(request, table=None):
+    status = request.GET.get("status", "VERIFIED")
+    if status not in dict(FeePayment.STATUS_CHOICES):
+        status = ""
+    try:
+        start = parse_date(request.GET.get("start", ""))
+        end = parse_date(request.GET.get("end", ""))
+    except ValueError:
+        start = end = None
+    if table is not None and table not in reports.TABLES:
+        raise Http404("Unknown report.")
+
+    report = reports.build(status, start, end)
+    if table:
+        response = HttpResponse(content_type="text/csv")
+        prefix = f"{shards.current()}-" if len(shards.campuses()) > 1 else ""
+        response["Content-Disposition"] = f'attachment; filename="{prefix}{table}-report.csv"'
+        reports.write_csv(response, report, table)
+        return response
+
+    return render(
+        request,
+        "portal/fee_report.html",
+        {"report": report, "campus_name": shards.name(shards.current()), "status": status, "start": start, "end": end, "query": request.GET.urlencode(), "status_choices": FeePayment.STATUS_CHOICES},
+    )
+
 @login_required
 def doc_type_list(request):
     if not request.user.is_staff:
@@ -159,7 +370,9 @@ def request_list(request):
     staff = request.user.is_staff
     q = request.GET.get("q", "").strip()
     status = request.GET.get("status", "").strip()
+    archived = request.GET.get("archived") == "1"
 
+    profile = None
     if staff:
         qs = DocumentRequest.objects.select_related("student", "doc_type").all()
     else:
@@ -176,13 +389,67 @@ def request_list(request):
             Q(reference_no__icontains=q)
             | Q(doc_type__name__icontains=q)
             | Q(purpose__icontains=q)
-            | Q(student__student_id__icontains=q)
+            | _student_match(q)
         )
 
     qs = qs.order_by("-requested_at")
-    return render(request, "portal/request_list.html", {"items": qs, "q": q, "status": status, "staff": staff})
+    archived_items = archive.search("DocumentRequest", q, status, student=profile) if archived else None
+    if staff:
+        qs = _merged(qs, "requested_at")
+        if archived:
+            archived_items = _merged(archived_items, "occurred_at", archive.SEARCH_LIMIT)
+
+    return render(
+        request,
+        "portal/request_list.html",
+        {
+            "items": qs,
+            "q": q,
+            "status": status,
+            "staff": staff,
+            "archived": archived,
+            "archived_items": archived_items,
+            "live_updates": staff and streaming(request),
+        },
+    )
+
+@user_passes_test(is_staff_user)
+def request_due(request):
+    try:
+        days = max(0, min(int(request.GET.get("days", 0)), 10))
+    except ValueError:
+        days = 0
+    now = timezone.now()
+    today = timezone.localdate()
+    horizon = sla.end_of_day(sla.add_business_days(today, days) if days else today)
+
+    def due():
+        open_requests = DocumentRequest.objects.filter(status__in=sla.OPEN_STATUSES)
+        return (
+            sla.due_queue(DocumentRequest.objects.select_related("student", "doc_type"), horizon, DUE_QUEUE_LIMIT),
+            open_requests.filter(due_at__lt=now).count(),
+            open_requests.filter(due_at__gte=now, due_at__lt=horizon).count(),
+        )
+
+    runs = list(shards.gather(due).values())
+    items = shards.merge((run[0] for run in runs), key=attrgetter("due_at"), limit=DUE_QUEUE_LIMIT)
+    for item in items:
+        item.overdue = item.due_at < now
+    return render(
+        request,
+        "portal/request_due.html",
+        {
+            "items": items,
+            "days": days,
+            "horizon": horizon,
+            "overdue": sum(run[1] for run in runs),
+            "due": sum(run[2] for run in runs),
+            "limit": DUE_QUEUE_LIMIT,
+        },
+    )
 
 @login_required
+@shards.campus_in_url
 def request_detail(request, pk):
     staff = request.user.is_staff
     if staff:
@@ -195,6 +462,13 @@ def request_detail(request, pk):
     return render(request, "portal/request_detail.html", {"obj": obj, "staff": staff})
 
 @login_required
+@shards.campus_in_url
+def request_slip(request, pk):
+    return _serve_printable(request, DocumentRequest, pk)
+
+@login_required
+@idempotency.idempotent("request_create")
+@throttled("submit")
 def request_create(request):
     profile = _profile_or_403(request.user)
     if not profile:
@@ -205,13 +479,13 @@ def request_create(request):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.student = profile
-            obj.save()
+            groupcommit.save(obj)
             messages.success(request, f"Request submitted. Ref: {obj.reference_no}")
             return redirect("request_list")
     else:
         form = DocumentRequestForm()
 
-    return render(request, "portal/form.html", {"form": form, "title": "New Document Request"})
+    return render(request, "portal/form.html", {"form": form, "title": "New Document Request", "idempotency_key": idempotency.new_key()})
 
 @login_required
 def request_update(request, pk):
@@ -226,6 +500,8 @@ def request_update(request, pk):
     if request.method == "POST":
         form = DocumentRequestForm(request.POST, instance=obj)
         if form.is_valid():
+            if "doc_type" in form.changed_data:
+                obj.schedule()
             form.save()
             messages.success(request, "Request updated.")
             return redirect("request_detail", pk=obj.pk)
@@ -252,14 +528,21 @@ def request_delete(request, pk):
     return render(request, "portal/confirm_delete.html", {"obj": obj, "title": "Delete Document Request"})
 
 @user_passes_test(is_staff_user)
+@shards.campus_in_url
 def request_process(request, pk):
-    obj = get_object_or_404(DocumentRequest, pk=pk)
+    obj = get_object_or_404(DocumentRequest.objects.select_related("claimed_by"), pk=pk)
+    old_status = obj.status
+    busy = _claimed_elsewhere(request, obj)
+    if busy:
+        return busy
     if request.method == "POST":
         form = DocumentRequestStaffForm(request.POST, instance=obj)
         if form.is_valid():
             form.save()
+            _queue_status_notice(obj, old_status)
+            workqueue.release(obj, request.user)
             messages.success(request, "Request processed.")
-            return redirect("request_detail", pk=obj.pk)
+            return _redirect_to("request_detail", obj)
     else:
         form = DocumentRequestStaffForm(instance=obj)
 
@@ -270,7 +553,9 @@ def appointment_list(request):
     staff = request.user.is_staff
     q = request.GET.get("q", "").strip()
     status = request.GET.get("status", "").strip()
+    archived = request.GET.get("archived") == "1"
 
+    profile = None
     if staff:
         qs = Appointment.objects.select_related("student").all()
     else:
@@ -283,11 +568,22 @@ def appointment_list(request):
         qs = qs.filter(status=status)
 
     if q:
-        qs = qs.filter(Q(office__icontains=q) | Q(topic__icontains=q) | Q(student__student_id__icontains=q))
+        qs = qs.filter(Q(office__icontains=q) | Q(topic__icontains=q) | _student_match(q))
 
-    return render(request, "portal/appointment_list.html", {"items": qs, "q": q, "status": status, "staff": staff})
+    archived_items = archive.search("Appointment", q, status, student=profile) if archived else None
+    if staff:
+        qs = _merged(qs, "schedule")
+        if archived:
+            archived_items = _merged(archived_items, "occurred_at", archive.SEARCH_LIMIT)
+
+    return render(
+        request,
+        "portal/appointment_list.html",
+        {"items": qs, "q": q, "status": status, "staff": staff, "archived": archived, "archived_items": archived_items},
+    )
 
 @login_required
+@throttled("submit")
 def appointment_create(request):
     profile = _profile_or_403(request.user)
     if not profile:
@@ -345,12 +641,19 @@ def appointment_delete(request, pk):
     return render(request, "portal/confirm_delete.html", {"obj": obj, "title": "Delete Appointment"})
 
 @user_passes_test(is_staff_user)
+@shards.campus_in_url
 def appointment_process(request, pk):
-    obj = get_object_or_404(Appointment, pk=pk)
+    obj = get_object_or_404(Appointment.objects.select_related("claimed_by"), pk=pk)
+    old_status = obj.status
+    busy = _claimed_elsewhere(request, obj)
+    if busy:
+        return busy
     if request.method == "POST":
         form = AppointmentStaffForm(request.POST, instance=obj)
         if form.is_valid():
             form.save()
+            _queue_status_notice(obj, old_status)
+            workqueue.release(obj, request.user)
             messages.success(request, "Appointment processed.")
             return redirect("appointment_list")
     else:
@@ -363,24 +666,38 @@ def payment_list(request):
     staff = request.user.is_staff
     q = request.GET.get("q", "").strip()
     status = request.GET.get("status", "").strip()
+    archived = request.GET.get("archived") == "1"
 
+    profile = None
     if staff:
         qs = FeePayment.objects.select_related("student").all()
     else:
         profile = _profile_or_403(request.user)
         if not profile:
             return HttpResponseForbidden("Student profile not found.")
-        qs = profile.payments.all()
+        qs = profile.payments.prefetch_related("proofs")
 
     if status:
         qs = qs.filter(status=status)
 
     if q:
-        qs = qs.filter(Q(fee_name__icontains=q) | Q(reference__icontains=q) | Q(student__student_id__icontains=q))
+        qs = qs.filter(Q(fee_name__icontains=q) | Q(reference__icontains=q) | _student_match(q))
 
-    return render(request, "portal/payment_list.html", {"items": qs, "q": q, "status": status, "staff": staff})
+    archived_items = archive.search("FeePayment", q, status, student=profile) if archived else None
+    if staff:
+        qs = _merged(qs, "paid_at")
+        if archived:
+            archived_items = _merged(archived_items, "occurred_at", archive.SEARCH_LIMIT)
+
+    return render(
+        request,
+        "portal/payment_list.html",
+        {"items": qs, "q": q, "status": status, "staff": staff, "archived": archived, "archived_items": archived_items},
+    )
 
 @login_required
+@idempotency.idempotent("payment_create")
+@throttled("submit")
 def payment_create(request):
     profile = _profile_or_403(request.user)
     if not profile:
@@ -391,13 +708,102 @@ def payment_create(request):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.student = profile
-            obj.save()
+            groupcommit.save(obj)
             messages.success(request, "Payment submitted for verification.")
             return redirect("payment_list")
     else:
         form = FeePaymentForm()
 
-    return render(request, "portal/form.html", {"form": form, "title": "New Fee Payment"})
+    return render(request, "portal/form.html", {"form": form, "title": "New Fee Payment", "idempotency_key": idempotency.new_key()})
+
+@login_required
+@shards.campus_in_url
+def payment_receipt(request, pk):
+    return _serve_printable(request, FeePayment, pk)
+
+@csrf_exempt
+@login_required
+@throttled("submit")
+def payment_proof_upload(request, pk):
+    # The streaming handler has to be in place before anything reads the body,
+    # CSRF checking included, so CSRF is enforced on the inner view instead.
+    handler = proofs.ProofUploadHandler(request)
+    request.upload_handlers = [handler]
+    try:
+        return _payment_proof_upload(request, pk, handler)
+    finally:
+        # Whatever the outcome (CSRF failure, 403, 404, a duplicate), a file
+        # not stored for a new proof is dropped from the temp directory.
+        handler.cleanup()
+
+@csrf_protect
+def _payment_proof_upload(request, pk, handler):
+    profile = _profile_or_403(request.user)
+    if not profile:
+        return HttpResponseForbidden("Student profile not found.")
+
+    payment = get_object_or_404(FeePayment, pk=pk, student=profile)
+    if request.method != "POST":
+        return redirect("payment_list")
+    if payment.status != "PENDING":
+        return HttpResponseForbidden("Proofs can only be added to pending payments.")
+
+    upload = request.FILES.get("proof")
+    if upload is None:
+        errors = {
+            "too_large": f"Files are limited to {filesizeformat(proofs.max_bytes())}.",
+            "bad_type": "Upload a JPEG or PNG image, or a PDF.",
+        }
+        messages.error(request, errors.get(handler.error, "Choose a file to upload."))
+        return redirect("payment_list")
+
+    if payment.proofs.filter(sha256=upload.sha256).exists():
+        messages.info(request, "That file is already attached to this payment.")
+        return redirect("payment_list")
+    if payment.proofs.count() >= getattr(settings, "PAYMENT_PROOF_MAX_FILES", 5):
+        messages.error(request, "This payment already has the maximum number of attachments.")
+        return redirect("payment_list")
+
+    # Same content uploaded before: reuse its thumbnail instead of making another.
+    thumbnailed = PaymentProof.objects.filter(sha256=upload.sha256, has_thumbnail=True).exists()
+    proof = PaymentProof.objects.create(
+        payment=payment,
+        sha256=upload.sha256,
+        size=upload.size,
+        content_type=upload.content_type,
+        original_name=upload.name.rsplit("/", 1)[-1][:200],
+        has_thumbnail=thumbnailed,
+    )
+    # Moved into the store only now that a proof refers to it.
+    try:
+        upload.store()
+    except OSError:
+        proof.delete()
+        raise
+    if not thumbnailed and proof.content_type in proofs.IMAGE_TYPES:
+        jobs.enqueue("portal.thumbnail_proof", pk=proof.pk)
+    messages.success(request, "Proof of payment uploaded.")
+    return redirect("payment_list")
+
+def _proof_or_404(request, pk):
+    qs = PaymentProof.objects.all()
+    if not request.user.is_staff:
+        qs = qs.filter(payment__student__user=request.user)
+    return get_object_or_404(qs, pk=pk)
+
+@login_required
+@shards.campus_in_url
+def payment_proof(request, pk):
+    proof = _proof_or_404(request, pk)
+    return proofs.ranged_response(request, proofs.blob_path(proof.sha256), proof.content_type, proof.original_name)
+
+@login_required
+@shards.campus_in_url
+def payment_proof_thumbnail(request, pk):
+    proof = _proof_or_404(request, pk)
+    if not proof.has_thumbnail:
+        raise Http404("No thumbnail yet.")
+    return proofs.ranged_response(request, proofs.thumbnail_path(proof.sha256), "image/jpeg")
 
 @login_required
 def payment_update(request, pk):
@@ -438,25 +844,34 @@ def payment_delete(request, pk):
     return render(request, "portal/confirm_delete.html", {"obj": obj, "title": "Delete Fee Payment"})
 
 @user_passes_test(is_staff_user)
+@shards.campus_in_url
 def payment_process(request, pk):
-    obj = get_object_or_404(FeePayment, pk=pk)
+    obj = get_object_or_404(FeePayment.objects.select_related("claimed_by"), pk=pk)
+    old_status = obj.status
+    busy = _claimed_elsewhere(request, obj)
+    if busy:
+        return busy
     if request.method == "POST":
         form = FeePaymentStaffForm(request.POST, instance=obj)
         if form.is_valid():
             form.save()
+            _queue_status_notice(obj, old_status)
+            workqueue.release(obj, request.user)
             messages.success(request, "Payment processed.")
             return redirect("payment_list")
     else:
         form = FeePaymentStaffForm(instance=obj)
 
-    return render(request, "portal/form.html", {"form": form, "title": "Process Payment"})
+    return render(request, "portal/form.html", {"form": form, "title": "Process Payment", "obj": obj, "proofs": obj.proofs.all()})
 
 @login_required
 def inquiry_list(request):
     staff = request.user.is_staff
     q = request.GET.get("q", "").strip()
     status = request.GET.get("status", "").strip()
+    archived = request.GET.get("archived") == "1"
 
+    profile = None
     if staff:
         qs = Inquiry.objects.select_related("student").all()
     else:
@@ -469,9 +884,19 @@ def inquiry_list(request):
         qs = qs.filter(status=status)
 
     if q:
-        qs = qs.filter(Q(subject__icontains=q) | Q(message__icontains=q) | Q(student__student_id__icontains=q))
+        qs = qs.filter(Q(subject__icontains=q) | Q(message__icontains=q) | _student_match(q))
 
-    return render(request, "portal/inquiry_list.html", {"items": qs, "q": q, "status": status, "staff": staff})
+    archived_items = archive.search("Inquiry", q, status, student=profile) if archived else None
+    if staff:
+        qs = _merged(qs, "created_at")
+        if archived:
+            archived_items = _merged(archived_items, "occurred_at", archive.SEARCH_LIMIT)
+
+    return render(
+        request,
+        "portal/inquiry_list.html",
+        {"items": qs, "q": q, "status": status, "staff": staff, "archived": archived, "archived_items": archived_items},
+    )
 
 @login_required
 def inquiry_create(request):
@@ -484,7 +909,7 @@ def inquiry_create(request):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.student = profile
-            obj.save()
+            groupcommit.save(obj)
             messages.success(request, "Inquiry sent.")
             return redirect("inquiry_list")
     else:
@@ -530,20 +955,55 @@ def inquiry_delete(request, pk):
 
     return render(request, "portal/confirm_delete.html", {"obj": obj, "title": "Delete Inquiry"})
 
+def _answer_duplicates(request, answered, pks):
+    """Give the open inquiries in ``pks`` the same status and reply as ``answered``."""
+    count = 0
+    for other in Inquiry.objects.filter(pk__in=pks, status="OPEN").exclude(pk=answered.pk):
+        if not workqueue.claim_one(other, request.user):
+            continue
+        other.status = answered.status
+        other.reply = answered.reply
+        other.replied_by = answered.replied_by
+        other.replied_at = answered.replied_at
+        other.save(update_fields=["status", "reply", "replied_by", "replied_at"])
+        _queue_status_notice(other, "OPEN")
+        workqueue.release(other, request.user)
+        count += 1
+    return count
+
 @user_passes_test(is_staff_user)
+@shards.campus_in_url
 def inquiry_process(request, pk):
-    obj = get_object_or_404(Inquiry, pk=pk)
+    obj = get_object_or_404(Inquiry.objects.select_related("claimed_by"), pk=pk)
+    old_status = obj.status
+    busy = _claimed_elsewhere(request, obj)
+    if busy:
+        return busy
     if request.method == "POST":
         form = InquiryStaffForm(request.POST, instance=obj)
         if form.is_valid():
             edited = form.save(commit=False)
-            if edited.reply and edited.status in ["ANSWERED", "CLOSED"]:
+            answered = edited.reply and edited.status in ["ANSWERED", "CLOSED"]
+            if answered:
                 edited.replied_by = request.user
                 edited.replied_at = timezone.now()
             edited.save()
-            messages.success(request, "Inquiry processed.")
+            _queue_status_notice(edited, old_status)
+            workqueue.release(edited, request.user)
+            also = _answer_duplicates(request, edited, [pk for pk in request.POST.getlist("also") if pk.isdigit()]) if answered else 0
+            messages.success(request, f"Inquiry processed, along with {also} similar {pluralize(also, 'inquiry,inquiries')}." if also else "Inquiry processed.")
             return redirect("inquiry_list")
     else:
         form = InquiryStaffForm(instance=obj)
 
-    return render(request, "portal/form.html", {"form": form, "title": "Reply / Update Inquiry"})
+    return render(
+        request,
+        "portal/form.html",
+        {
+            "form": form,
+            "title": "Reply / Update Inquiry",
+            "obj": obj,
+            "suggestions": suggestions.suggested_replies(obj),
+            "duplicates": suggestions.open_duplicates(obj) if obj.status == "OPEN" else [],
+        },
+    )
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, DocumentRequest, FeePayment, Inquiry
+
+# kind -> (model, open status, FIFO field, process url name)
+QUEUES = {
+    "requests": (DocumentRequest, "PENDING", "requested_at", "request_process"),
+    "appointments": (Appointment, "PENDING", "created_at", "appointment_process"),
+    "payments": (FeePayment, "PENDING", "created_at", "payment_process"),
+    "inquiries": (Inquiry, "OPEN", "created_at", "inquiry_process"),
+}
+
+
+def lease_length():
+    return timedelta(seconds=getattr(settings, "WORK_CLAIM_LEASE", 900))
+
+
+def _free(now):
+    return Q(claimed_by__isnull=True) | Q(claimed_until__lt=now)
+
+
+def claim_next(kind, user, limit=5):
+    """Hand ``user`` up to ``limit`` open items of ``kind`` nobody else holds.
+
+    Items the user already holds are returned first (and their lease renewed),
+    so reloading the page gives back the same batch. New items are taken with a
+    conditional UPDATE that only matches rows still free, so two staff members
+    asking at the same moment always get disjoint batches.
+    """
+    model, open_status, order_field, _ = QUEUES[kind]
+    now = timezone.now()
+    until = now + lease_length()
+    pending = model.objects.filter(status=open_status)
+
+    mine = pending.filter(claimed_by=user, claimed_until__gte=now)
+    mine.update(claimed_until=until)
+    held = mine.count()
+
+    wanted = limit - held
+    if wanted > 0:
+        free = pending.filter(_free(now)).order_by(order_field)
+        if connections[pending.db].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=pending.db):
+                ids = list(free.select_for_update(skip_locked=True).values_list("id", flat=True)[:wanted])
+                model.objects.filter(id__in=ids).update(claimed_by=user, claimed_until=until)
+        else:
+            ids = list(free.values_list("id", flat=True)[:wanted])
+            if ids:
+                pending.filter(_free(now), id__in=ids).update(claimed_by=user, claimed_until=until)
+
+    return pending.filter(claimed_by=user, claimed_until=until).select_related("student").order_by(order_field)
+
+
+def held(kind, user):
+    """Open items of ``kind`` whose lease ``user`` currently holds, oldest first."""
+    model, open_status, order_field, _ = QUEUES[kind]
+    mine = model.objects.filter(status=open_status, claimed_by=user, claimed_until__gte=timezone.now())
+    return mine.select_related("student").order_by(order_field)
+
+
+def claim_one(obj, user):
+    """Take (or renew) the lease on a single item; False if someone else holds it."""
+    now = timezone.now()
+    until = now + lease_length()
+    taken = (
+        obj.__class__.objects.filter(pk=obj.pk)
+        .filter(_free(now) | Q(claimed_by=user))
+        .update(claimed_by=user, claimed_until=until)
+    )
+    if taken:
+        obj.claimed_by = user
+        obj.claimed_until = until
+    return bool(taken)
+
+
+def release(obj, user):
+    obj.__class__.objects.filter(pk=obj.pk, claimed_by=user).update(claimed_by=None, claimed_until=None)
+    obj.claimed_by = None
+    obj.claimed_until = None
+
+
+def holder(obj):
+    if obj.claimed_by_id and obj.claimed_until and obj.claimed_until >= timezone.now():
+        return obj.claimed_by
+    return None